@@ -0,0 +1,348 @@
+"""
+Normalizing many terms at once.
+
+`normalize_batch` spreads independent terms over a process pool, each reduced by `reduce_bounded`
+within the given limits. Normal forms go into a `NormalFormCache`, an SQLite file keyed by a hash
+of the nameless form, which is the same for alpha-equivalent terms, so a term normalized in an
+earlier batch (or twice in this one) is looked up rather than reduced again. Before a term is sent
+off, its closed subterms whose normal forms are already cached are swapped for them, which leaves
+its normal form unchanged since the swap is a sequence of beta steps. The steps counted for such a
+term, and stored with its normal form, leave out those the swapped subterms took, so they are only
+a lower bound on what reducing it from scratch takes.
+
+Terms travel to the workers and into the cache as the BLC encoding of the term closed over its
+free variables, along with the names of those and of its binders. Unlike pickle this handles
+terms of any depth, and unlike `pretty_print` text it takes any variable names.
+
+  with NormalFormCache("normal_forms.db", max_entries = 100000) as cache:
+    results = normalize_batch(terms, cache, max_steps = 10000)
+"""
+import hashlib
+import os
+import sqlite3
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from weakref import WeakKeyDictionary
+
+from terms import Var, Lam, App
+from debruijn import Bound, Free, Abs, Apply, to_debruijn
+from core import lamn
+from blc import encode, decode_nameless
+from bounded import reduce_bounded, ReductionResult, NORMAL_FORM
+
+# Digest of each nameless node, built from those of its children
+_digests = WeakKeyDictionary()
+
+def _digest(term):
+  """A hash of a nameless term, computed bottom-up so only nodes not hashed before are visited"""
+  digests = _digests
+  stack = [term]
+  while stack:
+    node = stack[-1]
+    if node in digests:
+      stack.pop()
+      continue
+    kind = type(node)
+    if kind is Bound:
+      data = b"b" + str(node.index).encode()
+    elif kind is Free:
+      data = b"f" + node.name.encode()
+    elif kind is Abs:
+      body = digests.get(node.body)
+      if body is None:
+        stack.append(node.body)
+        continue
+      data = b"l" + body
+    elif kind is Apply:
+      (fn, arg) = (digests.get(node.fn), digests.get(node.arg))
+      if fn is None or arg is None:
+        stack.extend(child for (child, digest) in ((node.arg, arg), (node.fn, fn)) if digest is None)
+        continue
+      data = b"a" + fn + arg
+    else:
+      raise Exception(f"Unknown nameless term: {node}")
+    digests[node] = hashlib.sha256(data).digest()
+    stack.pop()
+  return digests[term]
+
+def _closed_key(nameless, names = ()):
+  digest = hashlib.sha256(_digest(nameless))
+  for name in names:
+    name = name.encode()
+    digest.update(struct.pack(">I", len(name)) + name)
+  return digest.digest()
+
+def term_key(expr):
+  """
+  A hash of expr that alpha-equivalent terms share: that of the nameless form of expr closed over
+  its free variables, in sorted order, followed by their names. Nameless nodes are shared and
+  remember their hashes, so keying a term only hashes the nodes it doesn't share with one keyed before.
+  """
+  names = sorted(expr.free_vars)
+  return _closed_key(to_debruijn(lamn(names, expr)), names)
+
+def _pack(expr):
+  """
+  Bytes for expr: how many free variables it has, then the names of those and of every binder in
+  the order they're met, then the BLC of expr closed over its free variables. The names put back
+  exactly the term that was packed.
+  """
+  free = sorted(expr.free_vars)
+  closed = lamn(free, expr)
+  parts = [struct.pack(">I", len(free))]
+  names = []
+  stack = [closed]
+  while stack:
+    node = stack.pop()
+    kind = type(node)
+    if kind is Lam:
+      names.append(node.var)
+      stack.append(node.expr)
+    elif kind is App:
+      stack.append(node.expr2)
+      stack.append(node.expr1)
+  parts.append(struct.pack(">I", len(names)))
+  for name in names:
+    name = name.encode()
+    parts.append(struct.pack(">I", len(name)) + name)
+  parts.append(encode(closed))
+  return b"".join(parts)
+
+def _unpack(data):
+  (free, count) = struct.unpack_from(">II", data)
+  position = 8
+  names = []
+  for _ in range(count):
+    (length,) = struct.unpack_from(">I", data, position)
+    names.append(data[position + 4:position + 4 + length].decode())
+    position += 4 + length
+  term = decode_nameless(data[position:])
+  names.reverse()
+  # The first binders close over the free variables, so they're left off and their variables stay free
+  scope = []
+  for _ in range(free):
+    scope.append(names.pop())
+    term = term.body
+  results = []
+  # Nameless subterms still to convert, and strings marking nodes to rebuild
+  tasks = [term]
+  while tasks:
+    term = tasks.pop()
+    kind = type(term)
+    if kind is Bound:
+      results.append(Var(scope[len(scope) - 1 - term.index]))
+    elif kind is Abs:
+      scope.append(names.pop())
+      tasks.append("lam")
+      tasks.append(term.body)
+    elif kind is Apply:
+      tasks.append("app")
+      tasks.append(term.arg)
+      tasks.append(term.fn)
+    elif term == "lam":
+      results.append(Lam(scope.pop(), results.pop()))
+    else:
+      arg = results.pop()
+      results.append(App(results.pop(), arg))
+  return results.pop()
+
+class NormalFormCache:
+  """
+  Normal forms on disk, with how many steps each took to reach, a lower bound for terms reduced
+  after swapping in cached subterms. With max_entries or max_bytes (of stored terms, compressed)
+  set, the least recently used entries are evicted to stay within them. ":memory:" gives a cache
+  that lasts as long as the object.
+  """
+  def __init__(self, path, max_entries = None, max_bytes = None):
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    self.db = sqlite3.connect(path)
+    self.db.execute("""
+      CREATE TABLE IF NOT EXISTS normal_forms (
+        key BLOB PRIMARY KEY,
+        term BLOB NOT NULL,
+        steps INTEGER NOT NULL,
+        used INTEGER NOT NULL
+      )""")
+    self.db.execute("CREATE INDEX IF NOT EXISTS normal_forms_used ON normal_forms (used)")
+    # Entries are stamped with a counter on every use, carried on from what is already stored
+    (self.clock, self.count, self.bytes) = self.db.execute(
+      "SELECT COALESCE(MAX(used), 0), COUNT(*), COALESCE(SUM(LENGTH(term)), 0) FROM normal_forms").fetchone()
+    self.hits = self.misses = 0
+
+  def _tick(self):
+    self.clock += 1
+    return self.clock
+
+  def lookup(self, key):
+    """(normal form, steps) for the term with this key, or None"""
+    found = self.peek(key)
+    if found is None:
+      self.misses += 1
+    else:
+      self.hits += 1
+    return found
+
+  def peek(self, key):
+    """lookup without counting a hit or a miss, for probing subterms. A hit still counts as a use."""
+    row = self.db.execute("SELECT term, steps FROM normal_forms WHERE key = ?", (key,)).fetchone()
+    if row is None:
+      return None
+    self.db.execute("UPDATE normal_forms SET used = ? WHERE key = ?", (self._tick(), key))
+    return (_unpack(zlib.decompress(row[0])), row[1])
+
+  def get(self, expr):
+    return self.lookup(term_key(expr))
+
+  def store(self, key, normal_form, steps, evict = True):
+    """Store a normal form, evicting old entries if that goes over a limit unless evict is false"""
+    data = zlib.compress(_pack(normal_form))
+    # The count and byte totals are kept up to date here, so staying within the limits never has to add them up
+    row = self.db.execute("SELECT LENGTH(term) FROM normal_forms WHERE key = ?", (key,)).fetchone()
+    if row is None:
+      self.count += 1
+    else:
+      self.bytes -= row[0]
+    self.bytes += len(data)
+    self.db.execute("INSERT OR REPLACE INTO normal_forms VALUES (?, ?, ?, ?)", (key, data, steps, self._tick()))
+    if evict:
+      self.evict()
+
+  def put(self, expr, normal_form, steps = 0):
+    self.store(term_key(expr), normal_form, steps)
+
+  def evict(self):
+    """Drop the least recently used entries until the cache is within its limits"""
+    over_entries = self.count - self.max_entries if self.max_entries is not None else 0
+    over_bytes = self.bytes - self.max_bytes if self.max_bytes is not None else 0
+    if over_entries <= 0 and over_bytes <= 0:
+      return
+    doomed = []
+    freed = 0
+    # Walk up from the least recently used through the index, only as far as needed
+    rows = self.db.execute("SELECT key, LENGTH(term) FROM normal_forms ORDER BY used ASC")
+    while len(doomed) < over_entries or freed < over_bytes:
+      row = rows.fetchone()
+      if row is None:
+        break
+      doomed.append((row[0],))
+      freed += row[1]
+    rows.close()
+    self.db.executemany("DELETE FROM normal_forms WHERE key = ?", doomed)
+    self.count -= len(doomed)
+    self.bytes -= freed
+
+  def __len__(self):
+    return self.db.execute("SELECT COUNT(*) FROM normal_forms").fetchone()[0]
+
+  def size_bytes(self):
+    return self.db.execute("SELECT COALESCE(SUM(LENGTH(term)), 0) FROM normal_forms").fetchone()[0]
+
+  def clear(self):
+    self.db.execute("DELETE FROM normal_forms")
+    self.count = self.bytes = 0
+    self.db.commit()
+
+  def commit(self):
+    self.db.commit()
+
+  def close(self):
+    self.db.commit()
+    self.db.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+def reuse_subterms(expr, cache, min_size = 16):
+  """
+  expr with each outermost closed subterm of at least min_size nodes whose normal form is cached
+  replaced by that normal form. Subterms inside a replaced one aren't looked at, nor is expr itself.
+  """
+  results = []
+  # Subterms to look at alongside their nameless forms, and markers for nodes to rebuild from their
+  # children. A closed subterm's part of the whole term's nameless form is its own nameless form,
+  # so its key comes from there without converting it again.
+  tasks = [(expr, to_debruijn(expr), False)]
+  while tasks:
+    (node, nameless, rebuild) = tasks.pop()
+    kind = type(node)
+    if rebuild:
+      if kind is Lam:
+        body = results.pop()
+        results.append(node if body is node.expr else Lam(node.var, body))
+      else:
+        expr2 = results.pop()
+        expr1 = results.pop()
+        results.append(node if expr1 is node.expr1 and expr2 is node.expr2 else App(expr1, expr2))
+      continue
+    if kind is not Lam and kind is not App:
+      results.append(node)
+      continue
+    if node is not expr and node.size >= min_size and not node.free_vars:
+      found = cache.peek(_closed_key(nameless))
+      if found is not None:
+        results.append(found[0])
+        continue
+    tasks.append((node, None, True))
+    if kind is Lam:
+      tasks.append((node.expr, nameless.body, False))
+    else:
+      tasks.append((node.expr2, nameless.arg, False))
+      tasks.append((node.expr1, nameless.fn, False))
+  return results.pop()
+
+def _normalize_job(job):
+  (data, max_steps, max_size, timeout, jets) = job
+  result = reduce_bounded(_unpack(data), max_steps, max_size, timeout, detect_cycles = True, jets = jets)
+  return (_pack(result.term), result.steps, result.reason, result.cycle_start)
+
+def normalize_batch(exprs, cache = None, workers = None, max_steps = None, max_size = None, timeout = None, jets = False, min_subterm_size = 16):
+  """
+  A ReductionResult for each of exprs, in order. Terms are reduced in a pool of `workers` processes
+  (one per CPU by default, in this process with 1), each within the limits given. With a cache,
+  cached normal forms are used as they are, with the steps stored for them, and new ones are
+  stored. Where cached subterms were swapped in first, steps is a lower bound. Limits apply per term, so without them a term with no normal form never finishes.
+  """
+  exprs = list(exprs)
+  results = [None] * len(exprs)
+  # Terms to reduce, one per distinct key, with the positions in exprs wanting each
+  pending = {}
+  for (index, expr) in enumerate(exprs):
+    key = term_key(expr) if cache is not None else index
+    if key in pending:
+      pending[key][1].append(index)
+      continue
+    found = cache.lookup(key) if cache is not None else None
+    if found is not None:
+      results[index] = ReductionResult(found[0], found[1], NORMAL_FORM)
+      continue
+    if cache is not None:
+      expr = reuse_subterms(expr, cache, min_subterm_size)
+    pending[key] = (expr, [index])
+
+  jobs = [(_pack(expr), max_steps, max_size, timeout, jets) for (expr, _) in pending.values()]
+  if workers == 1 or len(jobs) <= 1:
+    outputs = map(_normalize_job, jobs)
+    pool = None
+  else:
+    pool = ProcessPoolExecutor(workers)
+    outputs = pool.map(_normalize_job, jobs, chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1))))
+  try:
+    for ((key, (_, indices)), (data, steps, reason, cycle_start)) in zip(pending.items(), outputs):
+      result = ReductionResult(_unpack(data), steps, reason, cycle_start)
+      if cache is not None and result.normalized:
+        cache.store(key, result.term, steps, evict = False)
+      for index in indices:
+        results[index] = result
+  finally:
+    if pool is not None:
+      pool.shutdown()
+    if cache is not None:
+      # Once for the whole batch rather than after every normal form
+      cache.evict()
+      cache.commit()
+  return results
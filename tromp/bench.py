@@ -0,0 +1,181 @@
+"""
+Benchmarks for the hot paths, over a range of input sizes.
+
+Each case builds its input at every size and times the workload on it, keeping the best of a few
+runs, then runs it once more under tracemalloc for the peak memory it allocates. The exponent
+fitted to time against size gives the scaling curve in one number: about 1 for linear, 2 for
+quadratic. Normalization cases run once per engine, so alternative reducers can be compared
+with the current one on the same terms.
+
+  python bench.py                            every case
+  python bench.py pred alpha --quick         cases whose names contain "pred" or "alpha", small sizes only
+  python bench.py --json today.json          save the results
+  python bench.py --compare today.json       flag cases that got slower than saved results
+
+The layout caches are cleared before every run, and each input is let go of before the next is
+built, so caches kept per node start out empty too.
+"""
+import argparse
+import gc
+import json
+import math
+import sys
+import time
+import tracemalloc
+from itertools import islice
+
+from core import *
+from combinators import succ, pred, y_com
+import jets
+import layout
+from nbe import normalize
+from graph import graph_normalize
+
+def last(terms):
+  term = None
+  for term in terms:
+    pass
+  return term
+
+# Engines normalizing a term, each run on the same normalization workloads
+ENGINES = {
+  "beta": lambda expr: last(beta_reduce(expr)),
+  "jets": lambda expr: last(jets.jet_reduce(expr)),
+  "nbe": normalize,
+  "graph": graph_normalize,
+}
+
+def deep_term(n, prefix = ""):
+  """λf.λx.f (f ... x) with n applications, as nth_iter but with the binders named after prefix"""
+  (f, x) = (prefix + "f", prefix + "x")
+  body = var(x)
+  for _ in range(n):
+    body = app(var(f), body)
+  return lamn([f, x], body)
+
+def balanced(leaves):
+  """The leaves applied to each other in a balanced tree, rather than the left-leaning spine of appn"""
+  level = list(leaves)
+  while len(level) > 1:
+    level = [app(*level[i:i + 2]) if i + 1 < len(level) else level[i] for i in range(0, len(level), 2)]
+  return level[0]
+
+def wide_term(n, prefix = ""):
+  """A balanced tree of n leaves, alternating between two bound variables"""
+  names = (prefix + "a", prefix + "b")
+  return lamn(names, balanced(var(names[i % 2]) for i in range(n)))
+
+def layout_run(expr):
+  layout._draw_closed.cache_clear()
+  layout._boxes.clear()
+  return lambda: layout.draw_tromp(expr)
+
+class Case:
+  """
+  A workload over a range of sizes. setup(n) builds the input, untimed, and returns the function
+  that is timed.
+  """
+  def __init__(self, name, sizes, setup):
+    self.name = name
+    self.sizes = sizes
+    self.setup = setup
+
+def cases():
+  # Normal order reduction takes quadratic time on pred, so beta gets smaller inputs than the others
+  sizes = { "beta": (50, 100, 200, 400), "jets": (1000, 4000, 16000), "nbe": (1000, 4000, 16000), "graph": (1000, 4000, 16000) }
+  for (engine, normalize_with) in ENGINES.items():
+    for (name, combinator) in (("pred", pred), ("succ", succ)):
+      yield Case(f"normalize {name} n/{engine}", sizes[engine],
+                 lambda n, combinator = combinator, normalize_with = normalize_with: lambda: normalize_with(app(combinator, nth_iter(n))))
+  yield Case("y_com n steps", (25, 50, 100, 200), lambda n: lambda: list(islice(beta_reduce(y_com), n + 1)))
+  yield Case("alpha_equivalent deep", (1000, 10000, 100000),
+             lambda n: (lambda a, b: lambda: alpha_equivalent(a, b))(deep_term(n), deep_term(n, "_")))
+  yield Case("alpha_equivalent wide", (1000, 10000, 100000),
+             lambda n: (lambda a, b: lambda: alpha_equivalent(a, b))(wide_term(n), wide_term(n, "_")))
+  yield Case("make_all_lambda_vars_unique deep", (1000, 10000, 100000),
+             lambda n: (lambda expr: lambda: make_all_lambda_vars_unique(expr))(lamn(["x"] * n, var("x"))))
+  yield Case("make_all_lambda_vars_unique wide", (1000, 10000, 100000),
+             lambda n: (lambda expr: lambda: make_all_lambda_vars_unique(expr))(balanced([lam("x", var("x"))] * n)))
+  yield Case("draw_tromp deep", (1000, 10000, 100000), lambda n: layout_run(deep_term(n)))
+  yield Case("draw_tromp wide", (1000, 10000, 100000), lambda n: layout_run(wide_term(n)))
+
+def measure(case, n, repeat = 3):
+  """Best time of repeat runs and the peak memory allocated by one more, for case at size n"""
+  times = []
+  for _ in range(repeat):
+    run = case.setup(n)
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    times.append(time.perf_counter() - start)
+    # Let go of the input before building the next one, so caches keyed on it empty out
+    run = None
+  run = case.setup(n)
+  gc.collect()
+  tracemalloc.start()
+  run()
+  (_, peak) = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return { "case": case.name, "n": n, "seconds": min(times), "peak_bytes": peak }
+
+def scaling_exponent(results):
+  """Least squares slope of log time against log size, or None with fewer than two sizes"""
+  points = [(math.log(result["n"]), math.log(max(result["seconds"], 1e-9))) for result in results]
+  if len(points) < 2:
+    return None
+  mean_x = sum(x for (x, _) in points) / len(points)
+  mean_y = sum(y for (_, y) in points) / len(points)
+  spread = sum((x - mean_x) ** 2 for (x, _) in points)
+  return sum((x - mean_x) * (y - mean_y) for (x, y) in points) / spread
+
+def compare(results, baseline, tolerance = 1.25):
+  """(case, n, ratio) for every result more than tolerance times slower than its baseline"""
+  before = { (result["case"], result["n"]): result["seconds"] for result in baseline }
+  slower = []
+  for result in results:
+    old = before.get((result["case"], result["n"]))
+    if old and result["seconds"] > tolerance * old:
+      slower.append((result["case"], result["n"], result["seconds"] / old))
+  return slower
+
+def run_cases(selected = (), quick = False, repeat = 3, out = sys.stdout):
+  """Run the cases whose names contain any of the selected strings (all if none), returning every result"""
+  results = []
+  print(f"{'case':<40} {'n':>8} {'time':>12} {'peak':>10}", file = out)
+  for case in cases():
+    if selected and not any(word in case.name for word in selected):
+      continue
+    sizes = case.sizes[:2] if quick else case.sizes
+    case_results = [measure(case, n, repeat) for n in sizes]
+    for result in case_results:
+      print(f"{case.name:<40} {result['n']:>8} {result['seconds'] * 1e3:>10.2f}ms {result['peak_bytes'] / 2**20:>8.2f}MB", file = out)
+    exponent = scaling_exponent(case_results)
+    if exponent is not None:
+      print(f"{case.name:<40} {'scaling':>8} {f'n^{exponent:.2f}':>12}", file = out)
+    results.extend(case_results)
+  return results
+
+def run(argv = None):
+  parser = argparse.ArgumentParser(description = "Time reduction, alpha-equivalence and layout over growing inputs")
+  parser.add_argument("cases", nargs = "*", help = "only run cases whose names contain one of these")
+  parser.add_argument("--quick", action = "store_true", help = "only the two smallest sizes of each case")
+  parser.add_argument("--repeat", type = int, default = 3, help = "runs per size, keeping the fastest")
+  parser.add_argument("--json", help = "file to save the results to")
+  parser.add_argument("--compare", help = "results saved by an earlier --json run to check against")
+  parser.add_argument("--tolerance", type = float, default = 1.25, help = "slowdown ratio counted as a regression")
+  args = parser.parse_args(argv)
+
+  results = run_cases(args.cases, args.quick, args.repeat)
+  if args.json:
+    with open(args.json, "w") as file:
+      json.dump(results, file, indent = 1)
+  if args.compare:
+    with open(args.compare) as file:
+      slower = compare(results, json.load(file), args.tolerance)
+    for (case, n, ratio) in slower:
+      print(f"Slower: {case} at n={n}, {ratio:.2f}x", file = sys.stderr)
+    return 1 if slower else 0
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(run())
@@ -0,0 +1,161 @@
+"""
+Compare the explicit-stack traversals in main.py against the recursive versions they replaced.
+
+On shallow terms both should take about as long; on deep terms only the explicit-stack versions finish.
+Run with `python bench_traversals.py`.
+"""
+import sys
+import timeit
+from main import *
+from combinators import s_com, k_com, succ, pred
+from layout import iter_segments
+
+# The recursive versions, as they were before the switch to explicit stacks
+
+def recursive_get_free_vars(expr):
+  match expr:
+    case Var(name):
+      return {name}
+    case Lam(v, body):
+      return recursive_get_free_vars(body) - {v}
+    case App(expr1, expr2):
+      return recursive_get_free_vars(expr1) | recursive_get_free_vars(expr2)
+
+def recursive_get_bound_vars(expr):
+  match expr:
+    case Var(_):
+      return set()
+    case Lam(v, body):
+      return recursive_get_bound_vars(body) | {v}
+    case App(expr1, expr2):
+      return recursive_get_bound_vars(expr1) | recursive_get_bound_vars(expr2)
+
+def recursive_to_debruijn(expr):
+  from debruijn import Bound, Free, Abs, Apply
+  binders = {}
+  def convert(expr, depth):
+    match expr:
+      case Var(name):
+        depths = binders.get(name)
+        return Bound(depth - 1 - depths[-1]) if depths else Free(name)
+      case Lam(v, body):
+        binders.setdefault(v, []).append(depth)
+        result = Abs(convert(body, depth + 1))
+        binders[v].pop()
+        return result
+      case App(expr1, expr2):
+        return Apply(convert(expr1, depth), convert(expr2, depth))
+  return convert(expr, 0)
+
+def recursive_alpha_equivalent(expr1, expr2):
+  return recursive_to_debruijn(expr1) is recursive_to_debruijn(expr2)
+
+def recursive_make_all_lambda_vars_unique(expr):
+  fresh_vars = {}
+  free_vars = recursive_get_free_vars(expr)
+  used_names = free_vars | get_bound_vars(expr)
+  def make_unique(expr):
+    match expr:
+      case Lam(v, body):
+        if v not in fresh_vars and v not in free_vars:
+          fresh_vars[v] = 0
+          return lam(v, make_unique(body))
+        fresh_vars.setdefault(v, 0)
+        new_var = v
+        while new_var in used_names:
+          fresh_vars[v] += 1
+          new_var = v + str(fresh_vars[v])
+        used_names.add(new_var)
+        return lam(new_var, make_unique(rename_var(body, v, new_var)))
+      case App(expr1, expr2):
+        return app(make_unique(expr1), make_unique(expr2))
+      case _:
+        return expr
+  return make_unique(expr)
+
+def recursive_pretty_print(expr):
+  match expr:
+    case Var(name):
+      return name
+    case Lam(v, body):
+      return f"λ{v}.{recursive_pretty_print(body)}"
+    case App(expr1, expr2):
+      left = recursive_pretty_print(expr1)
+      right = recursive_pretty_print(expr2)
+      if isinstance(expr1, Lam):
+        left = f"({left})"
+      if isinstance(expr2, App):
+        right = f"({right})"
+      return f"{left} {right}"
+
+def recursive_draw_tromp(expr, origin = (MARGIN, MARGIN), lambda_heights = None):
+  lambda_heights = {} if lambda_heights is None else lambda_heights
+  match expr:
+    case Lam(var, expr):
+      lambda_heights[var] = origin[1]
+      (bbox, lines) = recursive_draw_tromp(expr, (origin[0], origin[1] + DIAGRAM_GAP[1]), lambda_heights)
+      lines.append((origin[0], origin[1], bbox.x + bbox.width + DIAGRAM_GAP[0]/2, origin[1]))
+      return (bbox, lines)
+    case App(expr1, expr2):
+      (bbox1, lines1) = recursive_draw_tromp(expr1, origin, lambda_heights)
+      (bbox2, lines2) = recursive_draw_tromp(expr2, (bbox1.x + bbox1.width + DIAGRAM_GAP[0], origin[1]), lambda_heights)
+      lines = lines1 + lines2
+      max_y = max(bbox1.y + bbox1.height, bbox2.y + bbox2.height)
+      lines.append((bbox1.x, max_y, bbox2.x + LINE_THICKNESS/2, max_y))
+      lines.append((bbox1.x, bbox1.y, bbox1.x, max_y))
+      lines.append((bbox2.x, bbox2.y, bbox2.x, max_y))
+      lines.append((bbox1.x, max_y, bbox1.x, max_y + DIAGRAM_GAP[1]))
+      return (BBox.from_points((bbox1.x, bbox1.y), (bbox2.x + bbox2.width, max_y + DIAGRAM_GAP[1])), lines)
+    case Var(name):
+      ox = origin[0] + DIAGRAM_GAP[0]/2
+      return (BBox(ox, origin[1], 0, 0), [(ox, lambda_heights[name], ox, origin[1])])
+
+def shallow_terms():
+  # Small and medium terms of modest depth, the kind the viewer normally deals with
+  yield ("S K K", appn(s_com, k_com, k_com))
+  yield ("pred 3", appn(pred, nth_iter(3)))
+  yield ("succ (succ 20)", appn(succ, appn(succ, nth_iter(20))))
+  wide = lam("x", var("x"))
+  for _ in range(6):
+    wide = app(wide, wide)
+  yield ("wide 2^6", lam("y", app(wide, var("y"))))
+
+def cases(expr):
+  expr2 = make_all_lambda_vars_unique(expr)
+  return [
+    # Free variables are cached on nodes and substitution skips subterms without the variable, so
+    # neither walks the term any more; get_bound_vars still visits every node
+    ("get_bound_vars", lambda: get_bound_vars(expr), lambda: recursive_get_bound_vars(expr)),
+    ("alpha_equivalent", lambda: alpha_equivalent(expr, expr2), lambda: recursive_alpha_equivalent(expr, expr2)),
+    ("make_all_lambda_vars_unique", lambda: make_all_lambda_vars_unique(expr), lambda: recursive_make_all_lambda_vars_unique(expr)),
+    ("pretty_print", lambda: pretty_print(expr), lambda: recursive_pretty_print(expr)),
+    ("draw_tromp", lambda: tuple(iter_segments(expr2)), lambda: recursive_draw_tromp(expr2)),
+  ]
+
+def time_per_call(fn, repeat = 5):
+  (count, _) = timeit.Timer(fn).autorange()
+  return min(timeit.Timer(fn).repeat(repeat, count)) / count
+
+def run_shallow():
+  print(f"{'term':<16} {'traversal':<28} {'recursive':>12} {'iterative':>12} {'ratio':>6}")
+  for (term_name, expr) in shallow_terms():
+    for (name, iterative, recursive) in cases(expr):
+      rec = time_per_call(recursive)
+      it = time_per_call(iterative)
+      print(f"{term_name:<16} {name:<28} {rec * 1e6:>10.1f}us {it * 1e6:>10.1f}us {it / rec:>6.2f}")
+
+def run_deep(n = 20000):
+  print(f"\nnth_iter({n}), {sys.getrecursionlimit()} recursion limit")
+  expr = appn(pred, nth_iter(n))
+  for (name, iterative, recursive) in cases(expr):
+    try:
+      recursive()
+      rec = "ok"
+    except RecursionError:
+      rec = "RecursionError"
+    it = time_per_call(iterative, repeat = 1)
+    print(f"{name:<28} recursive: {rec:<15} iterative: {it * 1e3:.1f}ms")
+
+if __name__ == "__main__":
+  run_shallow()
+  run_deep()
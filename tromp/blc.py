@@ -0,0 +1,181 @@
+"""
+Binary Lambda Calculus, John Tromp's bit encoding of closed lambda terms.
+
+  λM    is 00 followed by M
+  M N   is 01 followed by M and N
+  n     is n ones and a zero, for de Bruijn index n counting from 1
+
+The code is prefix free, so a term ends exactly where its last variable does and needs no length.
+Terms are packed into bytes most significant bit first and padded with zeros to a whole byte, which
+makes a file of them just their encodings one after another. `iter_terms` reads such a file
+through a memory map, decoding a term at a time.
+"""
+import mmap
+from terms import Var, Lam, App
+from debruijn import Bound, Abs, Apply, binder_name
+
+# Bits of every byte value, most significant first
+_BYTE_BITS = [format(value, "08b") for value in range(256)]
+
+def encode_bits(expr):
+  """The BLC bits of a closed term as a string of 0s and 1s"""
+  parts = []
+  # Depths of the enclosing binders for each name, innermost last
+  binders = {}
+  # Subterms as (expr, depth); a string in place of expr marks a binder going out of scope
+  tasks = [(expr, 0)]
+  while tasks:
+    (expr, depth) = tasks.pop()
+    kind = type(expr)
+    if kind is Var:
+      depths = binders.get(expr.name)
+      if not depths:
+        raise Exception(f"Free variable {expr.name} can't be encoded")
+      parts.append("1" * (depth - depths[-1]) + "0")
+    elif kind is Lam:
+      parts.append("00")
+      binders.setdefault(expr.var, []).append(depth)
+      tasks.append((expr.var, None))
+      tasks.append((expr.expr, depth + 1))
+    elif kind is App:
+      parts.append("01")
+      tasks.append((expr.expr2, depth))
+      tasks.append((expr.expr1, depth))
+    elif kind is str:
+      binders[expr].pop()
+    else:
+      raise Exception(f"Unknown expression type: {expr}")
+  return "".join(parts)
+
+def encode(expr):
+  bits = encode_bits(expr)
+  # Pad to a whole number of bytes
+  bits += "0" * (-len(bits) % 8)
+  return int(bits, 2).to_bytes(len(bits) // 8, "big")
+
+class BitReader:
+  """Reads bits out of a bytes-like buffer, such as an mmap, converting it a chunk at a time"""
+  def __init__(self, data, chunk = 1 << 16):
+    self.data = data
+    self.chunk = chunk
+    # The bits converted so far and not yet dropped, the bit offset of bits[0] within data,
+    # the position of the next bit to read within bits, and the next byte to convert
+    self.bits = ""
+    self.base = 0
+    self.position = 0
+    self.next_byte = 0
+
+  def _refill(self):
+    """Drop the bits already read and convert the next chunk. Returns False at the end of the data."""
+    if self.next_byte >= len(self.data):
+      return False
+    chunk = self.data[self.next_byte:self.next_byte + self.chunk]
+    self.next_byte += len(chunk)
+    self.bits = self.bits[self.position:] + "".join(_BYTE_BITS[value] for value in chunk)
+    self.base += self.position
+    self.position = 0
+    return True
+
+  def read(self, count):
+    while self.position + count > len(self.bits):
+      if not self._refill():
+        raise Exception("Unexpected end of BLC data")
+    value = self.bits[self.position:self.position + count]
+    self.position += count
+    return value
+
+  def read_unary(self):
+    """Count the ones before the next zero, and skip past it"""
+    while True:
+      end = self.bits.find("0", self.position)
+      if end != -1:
+        count = end - self.position
+        self.position = end + 1
+        return count
+      if not self._refill():
+        raise Exception("Unexpected end of BLC data")
+
+  def align(self):
+    """Skip the padding up to the next whole byte"""
+    self.position += -(self.base + self.position) % 8
+
+  def at_end(self):
+    return (self.base + self.position + 7) // 8 >= len(self.data)
+
+def read_term(reader, nameless = False):
+  """
+  Decode one term from a BitReader, named with the binder names `from_debruijn` would use, or
+  into nameless form. Either way no intermediate form is built.
+  """
+  # Terms still being built: "abs" waiting for a body, or ["app", fn] waiting for fn and then arg
+  pending = []
+  depth = 0
+  # Read straight from the reader's bits, only going back to it for more
+  (bits, position) = (reader.bits, reader.position)
+  while True:
+    if position + 2 > len(bits):
+      reader.position = position
+      if not reader._refill() and position + 1 >= len(bits):
+        raise Exception("Unexpected end of BLC data")
+      (bits, position) = (reader.bits, reader.position)
+    if bits[position] == "0":
+      if bits[position + 1] == "0":
+        pending.append("abs")
+        depth += 1
+      else:
+        pending.append(["app", None])
+      position += 2
+      continue
+
+    end = bits.find("0", position)
+    if end == -1:
+      reader.position = position
+      index = reader.read_unary() - 1
+      (bits, position) = (reader.bits, reader.position)
+    else:
+      # The leading 1 was the first bit, so the index counts the ones after it
+      index = end - position - 1
+      position = end + 1
+    if index >= depth:
+      raise Exception(f"Index {index + 1} is not bound")
+    term = Bound(index) if nameless else Var(binder_name(depth - 1 - index))
+
+    # Hand the finished term up to whatever was waiting for it
+    while pending:
+      frame = pending[-1]
+      if frame == "abs":
+        pending.pop()
+        depth -= 1
+        term = Abs(term) if nameless else Lam(binder_name(depth), term)
+      elif frame[1] is None:
+        frame[1] = term
+        break
+      else:
+        pending.pop()
+        term = Apply(frame[1], term) if nameless else App(frame[1], term)
+    else:
+      reader.position = position
+      return term
+
+def decode_nameless(data):
+  return read_term(BitReader(data), nameless = True)
+
+def decode(data):
+  return read_term(BitReader(data))
+
+def write_terms(path, exprs):
+  """Write terms one after another, each padded to a whole byte"""
+  with open(path, "wb") as out:
+    for expr in exprs:
+      out.write(encode(expr))
+
+def iter_terms(path, nameless = False):
+  """The terms written by `write_terms`, decoded one at a time from a memory map of the file"""
+  with open(path, "rb") as file:
+    if file.seek(0, 2) == 0:
+      return
+    with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as data:
+      reader = BitReader(data)
+      while not reader.at_end():
+        yield read_term(reader, nameless)
+        reader.align()
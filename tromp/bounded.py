@@ -0,0 +1,119 @@
+"""
+Reduction within limits.
+
+`beta_reduce` runs for as long as the caller keeps asking, which is forever on `omega omega`.
+`Reduction` steps through the same sequence but stops at a step count, a term size or a
+wall-clock budget, and spots a term coming back up to alpha-equivalence. Since nameless terms
+are hash-consed, a de Bruijn form is a canonical key and comparing two of them is an identity check,
+so a cycle is reported the first time it closes.
+
+Converting every step would cost a walk over the whole term each time, though. Renaming changes
+neither the size, the depth nor the free variables of a term, and nodes carry all three, so steps
+are first grouped by those. Only a step landing in a group that already holds a term is converted,
+along with the terms already there, and most steps never are.
+"""
+import time
+from core import beta_reduce
+from jets import jet_reduce
+from debruijn import to_debruijn
+
+NORMAL_FORM = "normal form"
+STEP_LIMIT = "step limit"
+SIZE_LIMIT = "size limit"
+TIME_LIMIT = "time limit"
+CYCLE = "cycle"
+
+class ReductionResult:
+  """
+  How a bounded reduction ended: the last term reached, the number of steps taken to get there,
+  and why it stopped. For a cycle, cycle_start is the step at which the repeated term first appeared.
+  """
+  __slots__ = ("term", "steps", "reason", "cycle_start")
+
+  def __init__(self, term, steps, reason, cycle_start = None):
+    self.term = term
+    self.steps = steps
+    self.reason = reason
+    self.cycle_start = cycle_start
+
+  @property
+  def normalized(self):
+    return self.reason == NORMAL_FORM
+
+  @property
+  def divergent(self):
+    """True only when divergence is certain, that is a cycle; hitting a limit proves nothing"""
+    return self.reason == CYCLE
+
+  def __repr__(self):
+    cycle = f", cycle_start={self.cycle_start}" if self.cycle_start is not None else ""
+    return f"ReductionResult(steps={self.steps}, reason={self.reason!r}{cycle})"
+
+class Reduction:
+  """
+  The terms of `beta_reduce(expr)`, starting with expr itself, up to whichever limit is hit
+  first. Limits left as None don't apply. Once iteration ends, `result` says why.
+  With jets, the steps are those of `jet_reduce` instead.
+  """
+  def __init__(self, expr, max_steps = None, max_size = None, timeout = None, detect_cycles = True, jets = False):
+    self.expr = expr
+    self.max_steps = max_steps
+    self.max_size = max_size
+    self.timeout = timeout
+    self.detect_cycles = detect_cycles
+    self.jets = jets
+    self.result = None
+
+  def __iter__(self):
+    deadline = None if self.timeout is None else time.monotonic() + self.timeout
+    # Every term seen so far as [term, step, nameless form or None until needed], grouped by what
+    # renaming can't change
+    seen = {}
+    steps = (jet_reduce if self.jets else beta_reduce)(self.expr)
+    term = next(steps)
+    count = 0
+    yield term
+    while True:
+      if self.detect_cycles:
+        start = _repeated(seen, term, count)
+        if start is not None:
+          self.result = ReductionResult(term, count, CYCLE, start)
+          return
+      # A normal form is reported as one however big it is
+      if not term.has_redex:
+        self.result = ReductionResult(term, count, NORMAL_FORM)
+        return
+      if self.max_size is not None and term.size > self.max_size:
+        self.result = ReductionResult(term, count, SIZE_LIMIT)
+        return
+      if self.max_steps is not None and count >= self.max_steps:
+        self.result = ReductionResult(term, count, STEP_LIMIT)
+        return
+      if deadline is not None and time.monotonic() >= deadline:
+        self.result = ReductionResult(term, count, TIME_LIMIT)
+        return
+      term = next(steps)
+      count += 1
+      yield term
+
+def _repeated(seen, term, step):
+  """The step at which a term alpha-equivalent to term was seen, or None after recording it as seen at step"""
+  group = seen.setdefault((term.size, term.depth, term.free_vars), [])
+  if group:
+    key = to_debruijn(term)
+    for entry in group:
+      if entry[2] is None:
+        entry[2] = to_debruijn(entry[0])
+      if entry[2] is key:
+        return entry[1]
+  else:
+    key = None
+  group.append([term, step, key])
+  return None
+
+def reduce_bounded(expr, max_steps = None, max_size = None, timeout = None, detect_cycles = True, jets = False):
+  """Reduce expr until it reaches a normal form or a limit, returning a ReductionResult"""
+  reduction = Reduction(expr, max_steps, max_size, timeout, detect_cycles, jets)
+  for _ in reduction:
+    pass
+  return reduction.result
@@ -0,0 +1,43 @@
+"""
+Common combinators and Church encodings, shared by the viewer and the tests.
+"""
+from core import var, lam, app, lamn, appn
+
+s_com = lam("x", lam("y", lam("z", app(app(var("x"), var("z")), app(var("y"), var("z"))))))
+k_com = lam("x", lam("y", var("x")))
+false = lam("x", lam("y", var("y")))
+i_com = lam("x", var("x"))
+omega = lam("x", app(var("x"), var("x")))
+y_com = lam("f", app(omega, lam("x", app(var("f"), app(var("x"), var("x"))))))
+
+succ = lamn(["n", "f", "x"],
+            appn(
+              var("f"),
+              appn(
+                var("n"),
+                var("f"),
+                var("x")
+              )
+            )
+)
+#  λn.λf.λx.n(λg.λh.h(g f))(λu.x)(λu.u)
+pred = lamn(["n", "f", "x"],
+            appn(
+              var("n"),
+              lamn(["g", "h"], appn(var("h"), appn(var("g"), var("f")))),
+              lam("u", var("x")),
+              lam("u", var("u"))
+            )
+)
+
+# More Church arithmetic and logic, which jets.py can also compute natively
+add = lamn(["m", "n", "f", "x"], appn(var("m"), var("f"), appn(var("n"), var("f"), var("x"))))
+mul = lamn(["m", "n", "f"], app(var("m"), app(var("n"), var("f"))))
+# m to the power n
+power = lamn(["m", "n"], app(var("n"), var("m")))
+
+true = k_com
+is_zero = lam("n", appn(var("n"), lam("u", false), true))
+and_com = lamn(["p", "q"], appn(var("p"), var("q"), var("p")))
+or_com = lamn(["p", "q"], appn(var("p"), var("p"), var("q")))
+not_com = lam("p", appn(var("p"), false, true))
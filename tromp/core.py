@@ -0,0 +1,348 @@
+"""
+The lambda calculus itself: term constructors, substitution, alpha-equivalence, normal order
+reduction and printing.
+
+Nothing here needs pygame (or anything outside the standard library), so batch jobs and worker
+processes can import it without loading SDL. main.py re-exports all of it alongside the viewer.
+Substitution, reduction and alpha-equivalence report to the tracer in instrument.py if one is installed.
+"""
+import instrument
+from terms import Var, Lam, App
+from debruijn import to_debruijn
+
+def lam(var, expr):
+  return Lam(var, expr)
+
+def lamn(vars, expr):
+  for v in reversed(vars):
+    expr = lam(v, expr)
+  return expr
+
+def app(expr1, expr2):
+  return App(expr1, expr2)
+
+def appn(*exprs):
+  if len(exprs) == 0:
+    raise Exception("No arguments to application")
+  expr = exprs[0]
+  for arg in exprs[1:]:
+    expr = app(expr, arg)
+  return expr
+
+def var(name):
+  return Var(name)
+
+def substitute(expr, var, inner):
+  """
+  Capture-avoiding substitution of inner for the free occurrences of var.
+
+  Reduction stays on named terms rather than going through debruijn.beta, because every step is
+  shown: converting back from the nameless form would replace the user's binder names with
+  generated ones in each frame. The renames here only touch binders that would actually capture,
+  and everything that only needs the result (nbe, graph, alpha_equivalent) works on nameless terms.
+  """
+  return substitute_all(expr, { var: inner })
+
+def substitute_all(expr, replacements):
+  """
+  Capture-avoiding simultaneous substitution, for a dict from names to their replacements.
+
+  This is done in one pass carrying a map from names to their replacements: when a binder
+  would capture a free variable of a replacement it is renamed, and the renaming is added
+  to the map for its body. Free variables are tracked per replacement so that a binder
+  shadowing a name being replaced stops causing renames further down. Subterms in which none
+  of the names being replaced occur free are kept as they are without being walked.
+  """
+  if expr.free_vars.isdisjoint(replacements):
+    if instrument.tracer is not None:
+      instrument.tracer.substituted(0, 0)
+    return expr
+  replacements = { name: (inner, get_free_vars(inner)) for (name, inner) in replacements.items() }
+  capturable = set().union(*(free_vars for (_, free_vars) in replacements.values()))
+  # Nodes rebuilt and binders renamed, for the tracer
+  (copied, renames) = (0, 0)
+  results = []
+  # Subterms as (expr, replacements, free variables of the replacements);
+  # a string in place of expr marks a node to rebuild
+  tasks = [(expr, replacements, capturable)]
+  while tasks:
+    (expr, replacements, capturable) = tasks.pop()
+    kind = type(expr)
+    if kind is str:
+      copied += 1
+      if expr == "app":
+        expr2 = results.pop()
+        results.append(app(results.pop(), expr2))
+      else:
+        results.append(lam(replacements, results.pop()))
+
+    elif expr.free_vars.isdisjoint(replacements):
+      # Nothing to replace below here
+      results.append(expr)
+
+    elif kind is Var:
+      replacement = replacements.get(expr.name)
+      results.append(expr if replacement is None else replacement[0])
+
+    elif kind is Lam:
+      v = expr.var
+      if v in replacements:
+        replacements = { name: r for (name, r) in replacements.items() if name != v }
+        capturable = set().union(*(free_vars for (_, free_vars) in replacements.values()))
+      # If the bound variable v appears free in a replacement, we need to rename it
+      if v in capturable:
+        avoid = get_free_vars(expr.expr)
+        new_var = v + "'"
+        while new_var in avoid or new_var in capturable:
+          new_var += "'"
+        replacements = { **replacements, v: (Var(new_var), {new_var}) }
+        capturable = capturable | {new_var}
+        v = new_var
+        renames += 1
+      tasks.append(("lam", v, None))
+      tasks.append((expr.expr, replacements, capturable))
+
+    elif kind is App:
+      tasks.append(("app", None, None))
+      tasks.append((expr.expr2, replacements, capturable))
+      tasks.append((expr.expr1, replacements, capturable))
+
+    else:
+      raise Exception(f"Unknown expression type: {expr}")
+  if instrument.tracer is not None:
+    instrument.tracer.substituted(copied, renames)
+  return results.pop()
+
+def rename_var(expr, old_var, new_var):
+  """Rename the free occurrences of old_var, without any capture checks"""
+  results = []
+  # Subterms as (expr, renaming); a string in place of expr marks a node to rebuild
+  tasks = [(expr, True)]
+  while tasks:
+    (expr, renaming) = tasks.pop()
+    kind = type(expr)
+    if kind is str:
+      if expr == "app":
+        expr2 = results.pop()
+        results.append(app(results.pop(), expr2))
+      else:
+        results.append(lam(renaming, results.pop()))
+    elif not renaming:
+      # old_var is rebound above this point
+      results.append(expr)
+    elif kind is Var:
+      results.append(var(new_var) if expr.name == old_var else expr)
+    elif kind is Lam:
+      tasks.append(("lam", expr.var))
+      tasks.append((expr.expr, expr.var != old_var))
+    elif kind is App:
+      tasks.append(("app", None))
+      tasks.append((expr.expr2, True))
+      tasks.append((expr.expr1, True))
+    else:
+      raise Exception(f"Unknown expression type: {expr}")
+  return results.pop()
+
+def alpha_equivalent(expr1, expr2):
+  if expr1 is expr2:
+    return True
+  # Renaming bound variables changes neither of these
+  if expr1.size != expr2.size or expr1.free_vars != expr2.free_vars:
+    return False
+  # Alpha-equivalent terms share one hash-consed nameless form
+  if instrument.tracer is None:
+    return to_debruijn(expr1) is to_debruijn(expr2)
+  start = instrument.clock()
+  equivalent = to_debruijn(expr1) is to_debruijn(expr2)
+  instrument.tracer.alpha_checked(instrument.clock() - start)
+  return equivalent
+
+def make_all_lambda_vars_unique(expr):
+  fresh_vars = {}
+  free_vars = get_free_vars(expr)
+  # Every name in the term, so a renamed binder can't collide with an existing one
+  used_names = get_bound_vars(expr) | free_vars
+  # What each name currently in scope was renamed to, innermost binder last
+  renamed = {}
+  results = []
+  # Subterms still to visit, and strings marking nodes to rebuild
+  tasks = [expr]
+  while tasks:
+    expr = tasks.pop()
+    kind = type(expr)
+    if kind is Lam:
+      v = expr.var
+      # A binder named like a free variable is renamed as well, so nothing can be captured later
+      if v not in fresh_vars and v not in free_vars:
+        fresh_vars[v] = 0
+        new_var = v
+      else:
+        fresh_vars.setdefault(v, 0)
+        new_var = v
+        while new_var in used_names:
+          fresh_vars[v] += 1
+          new_var = v + str(fresh_vars[v])
+        used_names.add(new_var)
+      renamed.setdefault(v, []).append(new_var)
+      tasks.append(v)
+      tasks.append(expr.expr)
+    elif kind is App:
+      tasks.append(None)
+      tasks.append(expr.expr2)
+      tasks.append(expr.expr1)
+    elif kind is Var:
+      # Only occurrences bound by a renamed lambda change
+      names = renamed.get(expr.name)
+      results.append(var(names[-1]) if names else expr)
+    elif expr is None:
+      expr2 = results.pop()
+      results.append(app(results.pop(), expr2))
+    elif kind is str:
+      results.append(lam(renamed[expr].pop(), results.pop()))
+    else:
+      raise Exception(f"Unknown expression type: {expr}")
+  return results.pop()
+
+def get_bound_vars(expr):
+  bound_vars = set()
+  stack = [expr]
+  while stack:
+    expr = stack.pop()
+    kind = type(expr)
+    if kind is Lam:
+      bound_vars.add(expr.var)
+      stack.append(expr.expr)
+    elif kind is App:
+      stack.append(expr.expr2)
+      stack.append(expr.expr1)
+    elif kind is not Var:
+      raise Exception(f"Unknown expression type: {expr}")
+  return bound_vars
+
+def get_free_vars(expr):
+  # Cached on every node when it is built; the set is shared, so it is read-only
+  return expr.free_vars
+
+def find_redex(expr):
+  """
+  Find the leftmost-outermost redex, looking inside lambda bodies as well.
+  Returns the path from the root as (parent, child) pairs along with the redex, or None in normal form.
+
+  Every node knows whether it contains a redex, so this walks straight down to it without backtracking.
+  """
+  if not expr.has_redex:
+    return None
+  path = []
+  node = expr
+  while True:
+    if type(node) is Lam:
+      path.append((node, "expr"))
+      node = node.expr
+    elif type(node.expr1) is Lam:
+      return (path, node)
+    elif node.expr1.has_redex:
+      path.append((node, "expr1"))
+      node = node.expr1
+    else:
+      path.append((node, "expr2"))
+      node = node.expr2
+
+def rebuild_path(path, replacement):
+  """Rebuild the spine from a redex back up to the root, reusing every untouched sibling"""
+  for (parent, child) in reversed(path):
+    match (parent, child):
+      case (Lam(v, _), _):
+        replacement = lam(v, replacement)
+      case (App(_, expr2), "expr1"):
+        replacement = app(replacement, expr2)
+      case (App(expr1, _), "expr2"):
+        replacement = app(expr1, replacement)
+  return replacement
+
+def contract(redex):
+  match redex:
+    case App(Lam(var, body), expr2):
+      return substitute(body, var, expr2)
+    case _:
+      raise Exception(f"Not a redex: {redex}")
+
+def beta_reduce_step(expr):
+  """Contract the leftmost-outermost redex, or return expr unchanged if it is in normal form"""
+  found = find_redex(expr)
+  if found is None:
+    return expr
+  (path, redex) = found
+  return rebuild_path(path, contract(redex))
+
+def is_redex(expr):
+  """Check if an expression contains any redexes (sub-expressions that can be reduced)"""
+  return expr.has_redex
+
+def beta_reduce(expr):
+  loc_expr = make_all_lambda_vars_unique(expr)
+
+  # First yield the initial expression
+  yield loc_expr
+
+  while True:
+    tracer = instrument.tracer
+    if tracer is not None:
+      start = instrument.clock()
+    found = find_redex(loc_expr)
+    if found is None:
+      # No redexes - we've reached normal form
+      return
+
+    # Contract the redex and rebuild only the path back to the root
+    (path, redex) = found
+    reduced = rebuild_path(path, contract(redex))
+    if tracer is not None:
+      tracer.step(loc_expr, path, reduced, instrument.clock() - start)
+    loc_expr = reduced
+    yield loc_expr
+
+def nth_iter(n):
+  body = var("x")
+  for _ in range(n):
+    body = app(var("f"), body)
+  return lamn(["f", "x"], body)
+
+def pretty_print(expr):
+  parts = []
+  # Subterms still to print and literal text, in reverse order. An application in function
+  # position is wrapped in a 1-tuple, since something follows it.
+  stack = [expr]
+  while stack:
+    expr = stack.pop()
+    kind = type(expr)
+    applied = kind is tuple
+    if applied:
+      (expr,) = expr
+      kind = type(expr)
+    if kind is str:
+      parts.append(expr)
+    elif kind is Var:
+      parts.append(expr.name)
+    elif kind is Lam:
+      parts.append("λ" + expr.var + ".")
+      stack.append(expr.expr)
+    elif kind is App:
+      (expr1, expr2) = (expr.expr1, expr.expr2)
+      # Only add parentheses for right side if it's an application, or a lambda with more
+      # arguments after it (otherwise the lambda can extend to the right, vars don't need parens)
+      if type(expr2) is App or (applied and type(expr2) is Lam):
+        stack.extend((")", expr2, "("))
+      else:
+        stack.append(expr2)
+      stack.append(" ")
+
+      # Lambda in function position needs parentheses
+      if type(expr1) is Lam:
+        stack.extend((")", expr1, "("))
+      elif type(expr1) is App:
+        stack.append((expr1,))
+      else:
+        stack.append(expr1)
+    else:
+      raise Exception(f"Unknown expression type: {expr}")
+  return "".join(parts)
@@ -0,0 +1,208 @@
+"""
+Nameless (de Bruijn indexed) terms.
+
+A bound variable is the number of lambdas between it and its binder, so alpha-equivalent
+terms have exactly one nameless form. Since nameless nodes are hash-consed as well, comparing
+two terms up to alpha-equivalence is a single conversion followed by an identity check.
+Substitution only has to shift indices, so it never captures and never invents names.
+
+Variables that are free in the whole term stay named (`Free`). Named binders only come back
+when converting to the named form for `pretty_print` and drawing.
+"""
+from terms import Node, Var, Lam, App
+
+class Bound(Node):
+  __slots__ = ("index", "size", "loose")
+  _fields = ("index",)
+  __match_args__ = ("index",)
+
+  def _build(self):
+    object.__setattr__(self, "size", 1)
+    object.__setattr__(self, "loose", self.index + 1)
+
+class Free(Node):
+  __slots__ = ("name", "size", "loose")
+  _fields = ("name",)
+  __match_args__ = ("name",)
+
+  def _build(self):
+    object.__setattr__(self, "size", 1)
+    object.__setattr__(self, "loose", 0)
+
+class Abs(Node):
+  __slots__ = ("body", "size", "loose")
+  _fields = ("body",)
+  __match_args__ = ("body",)
+
+  def _build(self):
+    object.__setattr__(self, "size", 1 + self.body.size)
+    object.__setattr__(self, "loose", max(self.body.loose - 1, 0))
+
+class Apply(Node):
+  __slots__ = ("fn", "arg", "size", "loose")
+  _fields = ("fn", "arg")
+  __match_args__ = ("fn", "arg")
+
+  def _build(self):
+    object.__setattr__(self, "size", 1 + self.fn.size + self.arg.size)
+    object.__setattr__(self, "loose", max(self.fn.loose, self.arg.loose))
+
+"""
+`loose` is one more than the largest index that points outside the term (0 for closed terms).
+Shifting and substitution use it to return untouched subterms without walking them.
+"""
+
+def to_debruijn(expr):
+  # Depths of the enclosing binders for each name, innermost last
+  binders = {}
+  results = []
+  # Subterms as (expr, depth); a string in place of expr marks a node to rebuild
+  tasks = [(expr, 0)]
+  while tasks:
+    (expr, depth) = tasks.pop()
+    kind = type(expr)
+    if kind is Var:
+      depths = binders.get(expr.name)
+      results.append(Bound(depth - 1 - depths[-1]) if depths else Free(expr.name))
+    elif kind is Lam:
+      binders.setdefault(expr.var, []).append(depth)
+      tasks.append(("abs", expr.var))
+      tasks.append((expr.expr, depth + 1))
+    elif kind is App:
+      tasks.append(("apply", None))
+      tasks.append((expr.expr2, depth))
+      tasks.append((expr.expr1, depth))
+    elif expr == "abs":
+      # Markers carry the binder's name where subterms carry their depth
+      binders[depth].pop()
+      results.append(Abs(results.pop()))
+    elif expr == "apply":
+      arg = results.pop()
+      results.append(Apply(results.pop(), arg))
+    else:
+      raise Exception(f"Unknown expression type: {expr}")
+  return results.pop()
+
+def binder_name(depth):
+  letters = "xyzwuv"
+  name = letters[depth % len(letters)]
+  return name if depth < len(letters) else name + str(depth // len(letters))
+
+def from_debruijn(term):
+  taken = free_names(term)
+  scope = []
+  results = []
+  # Subterms still to convert, and strings marking nodes to rebuild
+  tasks = [term]
+  while tasks:
+    term = tasks.pop()
+    kind = type(term)
+    if kind is Bound:
+      if term.index >= len(scope):
+        raise Exception(f"Unbound index {term.index}")
+      results.append(Var(scope[len(scope) - 1 - term.index]))
+    elif kind is Free:
+      results.append(Var(term.name))
+    elif kind is Abs:
+      v = binder_name(len(scope))
+      while v in taken:
+        v += "'"
+      scope.append(v)
+      tasks.append("lam")
+      tasks.append(term.body)
+    elif kind is Apply:
+      tasks.append("app")
+      tasks.append(term.arg)
+      tasks.append(term.fn)
+    elif term == "lam":
+      results.append(Lam(scope.pop(), results.pop()))
+    elif term == "app":
+      arg = results.pop()
+      results.append(App(results.pop(), arg))
+    else:
+      raise Exception(f"Unknown nameless term: {term}")
+  return results.pop()
+
+def free_names(term):
+  names = set()
+  stack = [term]
+  while stack:
+    term = stack.pop()
+    kind = type(term)
+    if kind is Free:
+      names.add(term.name)
+    elif kind is Abs:
+      stack.append(term.body)
+    elif kind is Apply:
+      stack.append(term.arg)
+      stack.append(term.fn)
+    elif kind is not Bound:
+      raise Exception(f"Unknown nameless term: {term}")
+  return names
+
+def shift(term, amount, cutoff = 0):
+  """Add amount to every index of term that points at or above cutoff"""
+  if amount == 0:
+    return term
+  results = []
+  # Subterms as (term, cutoff); a string in place of term marks a node to rebuild
+  tasks = [(term, cutoff)]
+  while tasks:
+    (term, cutoff) = tasks.pop()
+    kind = type(term)
+    if kind is str:
+      if term == "abs":
+        results.append(Abs(results.pop()))
+      else:
+        arg = results.pop()
+        results.append(Apply(results.pop(), arg))
+    elif term.loose <= cutoff:
+      results.append(term)
+    elif kind is Bound:
+      results.append(Bound(term.index + amount))
+    elif kind is Abs:
+      tasks.append(("abs", None))
+      tasks.append((term.body, cutoff + 1))
+    elif kind is Apply:
+      tasks.append(("apply", None))
+      tasks.append((term.arg, cutoff))
+      tasks.append((term.fn, cutoff))
+    else:
+      raise Exception(f"Unknown nameless term: {term}")
+  return results.pop()
+
+def substitute(term, index, inner):
+  """Replace index with inner, shifting inner as it moves under binders"""
+  results = []
+  # Subterms as (term, index); a string in place of term marks a node to rebuild
+  tasks = [(term, index)]
+  while tasks:
+    (term, index) = tasks.pop()
+    kind = type(term)
+    if kind is str:
+      if term == "abs":
+        results.append(Abs(results.pop()))
+      else:
+        arg = results.pop()
+        results.append(Apply(results.pop(), arg))
+    elif term.loose <= index:
+      results.append(term)
+    elif kind is Bound:
+      results.append(shift(inner, index) if term.index == index else term)
+    elif kind is Abs:
+      tasks.append(("abs", None))
+      tasks.append((term.body, index + 1))
+    elif kind is Apply:
+      tasks.append(("apply", None))
+      tasks.append((term.arg, index))
+      tasks.append((term.fn, index))
+    else:
+      raise Exception(f"Unknown nameless term: {term}")
+  return results.pop()
+
+def beta(body, arg):
+  """Contract the redex (λ.body) arg"""
+  return shift(substitute(body, 0, shift(arg, 1)), -1)
+
+def alpha_equivalent(expr1, expr2):
+  return to_debruijn(expr1) is to_debruijn(expr2)
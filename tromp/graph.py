@@ -0,0 +1,225 @@
+"""
+Call-by-need graph reduction.
+
+The term is compiled into a graph of mutable cells. Contracting a redex instantiates the
+lambda body, copying only the cells that mention the bound parameter, so the argument is
+linked in rather than copied into every occurrence. The redex cell is then overwritten in place
+with an indirection to its result, and everything sharing it sees the work exactly once.
+
+Normalization goes under a lambda by giving it a private copy with a fresh parameter, so
+reducing inside the body never touches a lambda that may still be applied elsewhere.
+Cells shared with other parts of the graph never mention such parameters, so updating them in
+place is always safe.
+"""
+from terms import Var, Lam, App
+from core import make_all_lambda_vars_unique, get_free_vars, get_bound_vars
+
+VAR, PARAM, LAM, APP, IND = range(5)
+
+_no_params = frozenset()
+
+class Cell:
+  """
+  tag VAR: a is the name of a free variable
+  tag PARAM: a is the display name of a lambda parameter
+  tag LAM: a is the parameter cell, b the body
+  tag APP: a is the function, b the argument
+  tag IND: a is the cell this one was reduced to
+
+  params holds the parameter cells that may occur free below this cell. Reduction only ever
+  removes parameters, so it stays a safe over-approximation as cells are updated.
+  """
+  __slots__ = ("tag", "a", "b", "params")
+
+  def __init__(self, tag, a, b, params):
+    self.tag = tag
+    self.a = a
+    self.b = b
+    self.params = params
+
+def mk_var(name):
+  return Cell(VAR, name, None, _no_params)
+
+def mk_param(name):
+  cell = Cell(PARAM, name, None, None)
+  cell.params = frozenset((cell,))
+  return cell
+
+def mk_lam(param, body):
+  return Cell(LAM, param, body, body.params - {param} if param in body.params else body.params)
+
+def mk_app(fn, arg):
+  if not arg.params or arg.params is fn.params:
+    params = fn.params
+  elif not fn.params:
+    params = arg.params
+  else:
+    params = fn.params | arg.params
+  return Cell(APP, fn, arg, params)
+
+def follow(cell):
+  while cell.tag == IND:
+    cell = cell.a
+  return cell
+
+def to_graph(expr):
+  scope = {}
+  free_cells = {}
+  values = []
+  tasks = [expr]
+  while tasks:
+    task = tasks.pop()
+    match task:
+      case Var(name):
+        params = scope.get(name)
+        if params:
+          values.append(params[-1])
+        else:
+          if name not in free_cells:
+            free_cells[name] = mk_var(name)
+          values.append(free_cells[name])
+      case Lam(v, body):
+        param = mk_param(v)
+        scope.setdefault(v, []).append(param)
+        tasks.append(("lam", param))
+        tasks.append(body)
+      case App(expr1, expr2):
+        tasks.append(("app", None))
+        tasks.append(expr2)
+        tasks.append(expr1)
+      case ("lam", param):
+        scope[param.a].pop()
+        values.append(mk_lam(param, values.pop()))
+      case ("app", _):
+        arg = values.pop()
+        values.append(mk_app(values.pop(), arg))
+      case _:
+        raise Exception(f"Unknown expression type: {task}")
+  return values.pop()
+
+def instantiate(body, param, arg):
+  """Copy of body with param replaced by arg. Cells that don't mention param are shared, not copied."""
+  copies = {}
+  stack = [body]
+  while stack:
+    cell = stack[-1]
+    if cell in copies:
+      stack.pop()
+      continue
+    target = follow(cell)
+    if param not in target.params:
+      copies[cell] = target
+    elif target is param:
+      copies[cell] = arg
+    elif target.tag == APP:
+      pending = [child for child in (target.a, target.b) if child not in copies]
+      if pending:
+        stack.extend(pending)
+        continue
+      copies[cell] = mk_app(copies[target.a], copies[target.b])
+    elif target.tag == LAM:
+      if target.b not in copies:
+        stack.append(target.b)
+        continue
+      copies[cell] = mk_lam(target.a, copies[target.b])
+    else:
+      copies[cell] = target
+    stack.pop()
+  return copies[body]
+
+def readback(root):
+  """Read the graph back into a term. Shared cells are read once and come back as shared term nodes."""
+  terms = {}
+  stack = [root]
+  while stack:
+    cell = stack[-1]
+    if cell in terms:
+      stack.pop()
+      continue
+    target = follow(cell)
+    if target.tag == APP:
+      pending = [child for child in (target.a, target.b) if child not in terms]
+      if pending:
+        stack.extend(pending)
+        continue
+      terms[cell] = App(terms[target.a], terms[target.b])
+    elif target.tag == LAM:
+      if target.b not in terms:
+        stack.append(target.b)
+        continue
+      terms[cell] = Lam(target.a.a, terms[target.b])
+    else:
+      terms[cell] = Var(target.a)
+    stack.pop()
+  return terms[root]
+
+class GraphReducer:
+  def __init__(self, expr):
+    self.used_names = get_bound_vars(expr) | get_free_vars(expr)
+    # The whole graph hangs off an indirection so the root can be replaced like any other slot
+    self.root = Cell(IND, to_graph(expr), None, _no_params)
+    self.step_count = 0
+
+  def fresh_name(self, hint):
+    name = hint
+    suffix = 0
+    while name in self.used_names:
+      suffix += 1
+      name = hint + str(suffix)
+    self.used_names.add(name)
+    return name
+
+  def steps(self):
+    """Reduce the graph to normal form in place, in normal order, yielding after every contraction"""
+    # Slots still to normalize, as (cell, field) pairs, the leftmost on top
+    slots = [(self.root, "a")]
+    while slots:
+      (owner, field) = slots.pop()
+      cell = follow(getattr(owner, field))
+      setattr(owner, field, cell)
+
+      # Unwind the spine to its head, contracting head redexes as they appear
+      spine = []
+      while True:
+        if cell.tag == APP:
+          spine.append(cell)
+          cell = follow(cell.a)
+        elif cell.tag == LAM and spine:
+          redex = spine.pop()
+          result = instantiate(cell.b, cell.a, redex.b)
+          # Everything sharing the redex sees the result from now on
+          redex.tag = IND
+          redex.a = result
+          redex.b = None
+          self.step_count += 1
+          yield
+          cell = follow(result)
+        else:
+          break
+
+      if cell.tag == LAM:
+        # Normalize under the binder on a private copy, since the lambda itself may be shared
+        param = mk_param(self.fresh_name(cell.a.a))
+        private = mk_lam(param, instantiate(cell.b, cell.a, param))
+        setattr(owner, field, private)
+        slots.append((private, "b"))
+      else:
+        # A variable applied to arguments: normalize the arguments, leftmost first
+        slots.extend((app_cell, "b") for app_cell in spine)
+
+  def readback(self):
+    return readback(self.root.a)
+
+def graph_reduce(expr):
+  """Same interface as beta_reduce, yielding the term after every contraction"""
+  reducer = GraphReducer(make_all_lambda_vars_unique(expr))
+  yield reducer.readback()
+  for _ in reducer.steps():
+    yield reducer.readback()
+
+def graph_normalize(expr):
+  """Normal form of expr without reading back the intermediate steps"""
+  reducer = GraphReducer(make_all_lambda_vars_unique(expr))
+  for _ in reducer.steps():
+    pass
+  return reducer.readback()
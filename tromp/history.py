@@ -0,0 +1,109 @@
+"""
+Reduction history with random access.
+
+Consecutive steps of a reduction differ in one subterm: the redex and the spine above it are
+rebuilt, everything else is shared. So rather than keeping every term, the history keeps, for
+each step, where the changed subterm sits (one byte per level) and the subterm that replaced it.
+Every so often it also keeps a whole term as a checkpoint. Getting step n back means taking the
+checkpoint before it and replaying the deltas in between, each of which only rebuilds a spine.
+
+Since nodes are interned, a replayed step is the very same object as the term that was recorded
+whenever that term is still alive anywhere.
+"""
+from terms import Lam, App
+
+# Directions along a path: into a lambda body, the function or the argument of an application
+BODY, FN, ARG = range(3)
+
+def diff(old, new):
+  """(directions, replacement) such that replacing the subterm of old at directions gives new"""
+  directions = bytearray()
+  while old is not new:
+    kind = type(new)
+    if kind is not type(old):
+      break
+    if kind is Lam:
+      if old.var != new.var:
+        break
+      directions.append(BODY)
+      (old, new) = (old.expr, new.expr)
+    elif kind is App:
+      if old.expr1 is new.expr1:
+        directions.append(ARG)
+        (old, new) = (old.expr2, new.expr2)
+      elif old.expr2 is new.expr2:
+        directions.append(FN)
+        (old, new) = (old.expr1, new.expr1)
+      else:
+        break
+    else:
+      break
+  return (bytes(directions), new)
+
+def replace_at(term, directions, replacement):
+  """term with the subterm at directions replaced, rebuilding only the spine above it"""
+  spine = []
+  for direction in directions:
+    spine.append(term)
+    term = term.expr if direction == BODY else term.expr1 if direction == FN else term.expr2
+  for (parent, direction) in zip(reversed(spine), reversed(directions)):
+    if direction == BODY:
+      replacement = Lam(parent.var, replacement)
+    elif direction == FN:
+      replacement = App(replacement, parent.expr2)
+    else:
+      replacement = App(parent.expr1, replacement)
+  return replacement
+
+class History:
+  """
+  Every term of a reduction, indexed by step. Terms are added with `append` as they are reached,
+  and any step can be read back with `history[step]` at the cost of at most `checkpoint_every`
+  spine rebuilds.
+  """
+  def __init__(self, first, checkpoint_every = 64):
+    self.checkpoint_every = checkpoint_every
+    # The terms at steps 0, checkpoint_every, 2 * checkpoint_every, ...
+    self.checkpoints = [first]
+    # (directions, replacement) leading to each step from the one before, starting with step 1
+    self.deltas = []
+    self.last = first
+    # The step most recently read back, so scrubbing forward replays one delta at a time
+    self.cursor = (0, first)
+
+  def __len__(self):
+    return len(self.deltas) + 1
+
+  def append(self, term):
+    self.deltas.append(diff(self.last, term))
+    self.last = term
+    if len(self.deltas) % self.checkpoint_every == 0:
+      self.checkpoints.append(term)
+
+  def extend(self, terms):
+    for term in terms:
+      self.append(term)
+
+  def __getitem__(self, step):
+    if step < 0:
+      step += len(self)
+    if not 0 <= step < len(self):
+      raise IndexError(f"Step {step} out of range for a history of {len(self)} steps")
+    if step == len(self) - 1:
+      return self.last
+
+    (start, term) = (step - step % self.checkpoint_every, self.checkpoints[step // self.checkpoint_every])
+    if start <= self.cursor[0] <= step:
+      (start, term) = self.cursor
+    for (directions, replacement) in self.deltas[start:step]:
+      term = replace_at(term, directions, replacement)
+    self.cursor = (step, term)
+    return term
+
+  def __iter__(self):
+    for step in range(len(self)):
+      yield self[step]
+
+  def changed_nodes(self):
+    """Total size of all the replacements, roughly the memory the deltas hold on to"""
+    return sum(replacement.size for (_, replacement) in self.deltas)
@@ -0,0 +1,115 @@
+"""
+Instrumentation for reduction and layout.
+
+While a Tracer is installed, the reducer and the layout report to it: every reduction step with
+the position of its redex, the term size before and after and the time taken, every substitution
+with the nodes it rebuilt and the binders it had to rename to avoid capture, and the time spent
+checking alpha-equivalence and laying out diagrams. The tracer keeps totals, calls any step
+callbacks and can write each event out as a line of JSON.
+
+  with tracing(Tracer(open("trace.jsonl", "w"))) as tracer:
+    for term in beta_reduce(expr):
+      ...
+  print(tracer.summary())
+
+With no tracer installed each hook is a module attribute lookup and a comparison. This module
+imports nothing outside the standard library, so core.py and layout.py can depend on it.
+"""
+import json
+import time
+from contextlib import contextmanager
+
+# The installed Tracer, or None. Hooks read it as `instrument.tracer` so installing one takes
+# effect everywhere at once.
+tracer = None
+
+clock = time.perf_counter
+
+# Letters for each step down the path to a redex: into a lambda body, the function or the argument
+_DIRECTIONS = {"expr": "b", "expr1": "f", "expr2": "a"}
+
+class Tracer:
+  """
+  Totals of everything reported, as `counters` and `timings` in seconds. With out, a file opened
+  for writing, each event is also written to it as one JSON object per line.
+  """
+  def __init__(self, out = None):
+    self.out = out
+    self.counters = { "steps": 0, "jet_steps": 0, "substitutions": 0, "nodes_copied": 0, "renames": 0, "layouts": 0, "segments": 0 }
+    self.timings = { "reduce": 0.0, "alpha": 0.0, "draw_tromp": 0.0 }
+    self.callbacks = []
+    # Substitution work since the last step, which it is then charged to
+    (self.copied, self.renamed) = (0, 0)
+
+  def on_step(self, callback):
+    """Call callback with the record of each reduction step as it is taken"""
+    self.callbacks.append(callback)
+
+  def emit(self, record):
+    if self.out is not None:
+      self.out.write(json.dumps(record) + "\n")
+
+  def substituted(self, copied, renames):
+    self.counters["substitutions"] += 1
+    self.counters["nodes_copied"] += copied
+    self.counters["renames"] += renames
+    self.copied += copied
+    self.renamed += renames
+
+  def step(self, before, path, after, seconds):
+    """
+    A step from before to after. path holds the (parent, child) pairs down to the redex as
+    `find_redex` returns them, or is None for a step in which jets fired.
+    """
+    counters = self.counters
+    counters["steps"] += 1
+    if path is None:
+      counters["jet_steps"] += 1
+    self.timings["reduce"] += seconds
+    record = {
+      "event": "step",
+      "step": counters["steps"],
+      "path": None if path is None else "".join(_DIRECTIONS[child] for (_, child) in path),
+      "size_before": before.size,
+      "size_after": after.size,
+      "copied": self.copied,
+      "renames": self.renamed,
+      "seconds": seconds,
+    }
+    (self.copied, self.renamed) = (0, 0)
+    for callback in self.callbacks:
+      callback(record)
+    self.emit(record)
+
+  def alpha_checked(self, seconds):
+    self.timings["alpha"] += seconds
+
+  def laid_out(self, expr, segments, seconds):
+    self.counters["layouts"] += 1
+    self.counters["segments"] += segments
+    self.timings["draw_tromp"] += seconds
+    self.emit({ "event": "layout", "size": expr.size, "segments": segments, "seconds": seconds })
+
+  def summary(self):
+    return { **self.counters, **{ f"{name}_seconds": seconds for (name, seconds) in self.timings.items() } }
+
+  def close(self):
+    """Write the totals as a final event"""
+    self.emit({ "event": "summary", **self.summary() })
+
+@contextmanager
+def tracing(new_tracer = None):
+  """Install a tracer (a fresh one by default) for the duration of the block"""
+  global tracer
+  previous = tracer
+  tracer = Tracer() if new_tracer is None else new_tracer
+  try:
+    yield tracer
+  finally:
+    tracer.close()
+    tracer = previous
+
+def read_trace(path):
+  """The events of a JSON lines trace"""
+  with open(path) as file:
+    return [json.loads(line) for line in file if line.strip()]
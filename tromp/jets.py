@@ -0,0 +1,180 @@
+"""
+Jets: native shortcuts for Church arithmetic and logic.
+
+Applying `succ`, `add`, `mul`, `power` and friends to Church numerals takes a number of beta steps
+that grows with the numbers involved, exponentially so for `power`. A jet recognizes one of these
+combinators (up to alpha-equivalence) applied to arguments that are already Church numerals or
+booleans, computes the answer with Python ints and bools, and puts the encoding of the answer in
+its place.
+
+The answer is the normal form the applied combinator would have reduced to, so the term is
+beta-equivalent to what it was and, by Church-Rosser, still has the same normal form. `jet_reduce`
+follows `beta_reduce`, except that whenever a jet can fire, every such application in the term is
+replaced in one step before going on.
+"""
+from weakref import WeakKeyDictionary
+import instrument
+from terms import Term, Var, Lam, App
+from debruijn import to_debruijn
+from core import nth_iter, make_all_lambda_vars_unique, find_redex, rebuild_path, contract
+from combinators import succ, pred, add, mul, power, is_zero, true, false, i_com, and_com, or_com, not_com
+
+NUMERAL = "numeral"
+BOOLEAN = "boolean"
+
+def numeral_value(expr):
+  """n if expr is the Church numeral λf.λx.f (f ... (f x)) with n applications, otherwise None"""
+  if type(expr) is not Lam or type(expr.expr) is not Lam:
+    return None
+  (f, x) = (expr.var, expr.expr.var)
+  body = expr.expr.expr
+  count = 0
+  applied = Var(f)
+  # With both binders named alike, every occurrence means x and only zero can match
+  while f != x and type(body) is App and body.expr1 is applied:
+    count += 1
+    body = body.expr2
+  return count if body is Var(x) else None
+
+def boolean_value(expr):
+  """True for λa.λb.a, False for λa.λb.b, otherwise None. False is also the numeral zero."""
+  if type(expr) is not Lam or type(expr.expr) is not Lam or type(expr.expr.expr) is not Var:
+    return None
+  name = expr.expr.expr.name
+  if name == expr.expr.var:
+    return False
+  return True if name == expr.var else None
+
+def church(value):
+  """The Church encoding of a bool or a natural number"""
+  if type(value) is bool:
+    return true if value else false
+  return nth_iter(value)
+
+_READERS = {NUMERAL: numeral_value, BOOLEAN: boolean_value}
+
+# Nameless form of each jetted combinator, which alpha-equivalent terms share, mapped to the kinds
+# of its arguments and the native function computing its result
+_jets = {}
+# Sizes of the jetted combinators, so most heads are ruled out without converting them
+_jet_sizes = set()
+_max_arity = 0
+# The result of accelerating each node visited so far, None when nothing in it changed
+_accelerated = WeakKeyDictionary()
+
+def register(combinator, kinds, function):
+  """
+  Compute `combinator` applied to len(kinds) arguments with function, whenever each argument is a
+  value of the matching kind (NUMERAL or BOOLEAN). function returns an int or a bool to be
+  encoded, or a term where the normal form isn't the plain encoding.
+  """
+  global _max_arity
+  if combinator.free_vars:
+    raise Exception(f"Only closed terms can be jets: {combinator}")
+  _jets[to_debruijn(combinator)] = (tuple(kinds), function)
+  _jet_sizes.add(combinator.size)
+  _max_arity = max(_max_arity, len(kinds))
+  # Terms already looked at may hold applications of the new jet
+  _accelerated.clear()
+
+register(succ, (NUMERAL,), lambda n: n + 1)
+register(pred, (NUMERAL,), lambda n: max(n - 1, 0))
+register(add, (NUMERAL, NUMERAL), lambda m, n: m + n)
+register(mul, (NUMERAL, NUMERAL), lambda m, n: m * n)
+# power m 0 is 0 m, which normalizes to λx.x rather than to the numeral 1
+register(power, (NUMERAL, NUMERAL), lambda m, n: m ** n if n else i_com)
+register(is_zero, (NUMERAL,), lambda n: n == 0)
+register(and_com, (BOOLEAN, BOOLEAN), lambda p, q: p and q)
+register(or_com, (BOOLEAN, BOOLEAN), lambda p, q: p or q)
+register(not_com, (BOOLEAN,), lambda p: not p)
+
+def fire(expr):
+  """The encoded result if expr is a jet applied to values of the right kinds, otherwise None"""
+  args = []
+  head = expr
+  while type(head) is App and len(args) < _max_arity:
+    args.append(head.expr2)
+    head = head.expr1
+    if head.size not in _jet_sizes or head.free_vars:
+      continue
+    jet = _jets.get(to_debruijn(head))
+    if jet is None:
+      continue
+    (kinds, function) = jet
+    if len(kinds) != len(args):
+      return None
+    values = [_READERS[kind](arg) for (kind, arg) in zip(kinds, reversed(args))]
+    if None in values:
+      return None
+    result = function(*values)
+    return result if isinstance(result, Term) else church(result)
+  return None
+
+def accelerate(expr):
+  """
+  expr with every jet application whose arguments are values replaced by its result, innermost
+  first so results can feed further jets. Only subterms not accelerated before are visited.
+  """
+  done = _accelerated
+
+  def result(node):
+    return node if type(node) is Var or done[node] is None else done[node]
+
+  stack = [expr]
+  while stack:
+    node = stack[-1]
+    kind = type(node)
+    if kind is Var or node in done:
+      stack.pop()
+      continue
+    if kind is Lam:
+      if node.expr not in done and type(node.expr) is not Var:
+        stack.append(node.expr)
+        continue
+      body = result(node.expr)
+      new = node if body is node.expr else Lam(node.var, body)
+    elif kind is App:
+      pending = [child for child in (node.expr2, node.expr1) if type(child) is not Var and child not in done]
+      if pending:
+        stack.extend(pending)
+        continue
+      (expr1, expr2) = (result(node.expr1), result(node.expr2))
+      new = node if expr1 is node.expr1 and expr2 is node.expr2 else App(expr1, expr2)
+      fired = fire(new)
+      if fired is not None:
+        new = fired
+    else:
+      raise Exception(f"Unknown expression type: {node}")
+    if new is not node:
+      done[node] = new
+      # What comes out has nothing left to accelerate
+      if type(new) is not Var:
+        done[new] = None
+    else:
+      done[node] = None
+    stack.pop()
+  return result(expr)
+
+def jet_reduce(expr):
+  """
+  The terms of a normal order reduction of expr, as `beta_reduce` yields them, except that a step
+  where jets can fire replaces all of their applications at once instead of contracting a redex.
+  """
+  term = make_all_lambda_vars_unique(expr)
+  yield term
+  while True:
+    tracer = instrument.tracer
+    if tracer is not None:
+      start = instrument.clock()
+    reduced = accelerate(term)
+    path = None
+    if reduced is term:
+      found = find_redex(term)
+      if found is None:
+        return
+      (path, redex) = found
+      reduced = rebuild_path(path, contract(redex))
+    if tracer is not None:
+      tracer.step(term, path, reduced, instrument.clock() - start)
+    term = reduced
+    yield term
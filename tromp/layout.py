@@ -0,0 +1,198 @@
+"""
+Layout of Tromp diagrams.
+
+A tromp diagram is given by a list of line components along with a bounding box size.
+The output of the diagram is the bottom left corner of the bounding box.
+
+Lambdas are represented by lines above the body of the diagram. Bound variables emanate from their binding lambda.
+Applications are represented by horizontal lines connecting the outputs of the two components.
+For both lambdas and applications, the size of the diagram is the size of the body of the diagram plus a gap.
+
+A subterm's diagram looks the same wherever it is drawn, up to a translation and the heights of
+the lambdas binding its free variables. So each interned node remembers its bounding box relative
+to its own origin, and consecutive reduction steps, which share almost all of their subterms, only
+measure the nodes that are new. Placing the lines is then a single pass with no measuring left to do.
+
+Only the boxes are memoized, not the lines: every diagram still emits all of its segments, so
+laying out a new step costs time linear in its segment count (measuring is the small part of
+that). Keeping each node's segments relative to its origin would copy every subterm's lines
+into each of its ancestors, which is quadratic in memory on deep spines such as numerals. Only
+whole closed diagrams are reused, through the caches on draw_tromp and draw_lod.
+"""
+from functools import lru_cache
+from weakref import WeakKeyDictionary
+import instrument
+from terms import Var, Lam, App
+
+DIAGRAM_GAP = (15, 10)
+MARGIN = 15
+LINE_THICKNESS = 4
+# Whole diagrams kept by the layout caches. Each holds every line of a term and keeps its nodes'
+# boxes alive, so this covers the frame on screen and the few the viewer's worker prepares ahead.
+CACHED_DIAGRAMS = 6
+
+class BBox:
+  @staticmethod
+  def from_points(top_left, bottom_right):
+    return BBox(top_left[0], top_left[1], bottom_right[0] - top_left[0], bottom_right[1] - top_left[1])
+
+  def __init__(self, x, y, width, height):
+    self.x = x
+    self.y = y
+    self.width = width
+    self.height = height
+
+  def top_left(self):
+    return (self.x, self.y)
+
+  def bottom_right(self):
+    return (self.x + self.width, self.y + self.height)
+
+# Bounding box of each node's diagram drawn at (0, 0), as (x, y, width, height)
+_boxes = WeakKeyDictionary()
+
+def measure(expr):
+  """Bounding box of expr drawn at (0, 0). Only subterms that haven't been measured before are visited."""
+  boxes = _boxes
+  stack = [expr]
+  while stack:
+    node = stack[-1]
+    if node in boxes:
+      stack.pop()
+      continue
+    kind = type(node)
+    if kind is Var:
+      box = (DIAGRAM_GAP[0]/2, 0, 0, 0)
+    elif kind is Lam:
+      body = boxes.get(node.expr)
+      if body is None:
+        stack.append(node.expr)
+        continue
+      box = (body[0], body[1] + DIAGRAM_GAP[1], body[2], body[3])
+    elif kind is App:
+      box1 = boxes.get(node.expr1)
+      box2 = boxes.get(node.expr2)
+      if box1 is None or box2 is None:
+        stack.extend(child for (child, box) in ((node.expr2, box2), (node.expr1, box1)) if box is None)
+        continue
+      # expr2 starts to the right of expr1
+      x2 = box1[0] + box1[2] + DIAGRAM_GAP[0]
+      max_y = max(box1[1] + box1[3], box2[1] + box2[3])
+      box = (box1[0], box1[1], x2 + box2[0] + box2[2] - box1[0], max_y + DIAGRAM_GAP[1] - box1[1])
+    else:
+      raise Exception(f"Unknown expression type: {node}")
+    boxes[node] = box
+    stack.pop()
+  return boxes[expr]
+
+def iter_segments(expr, origin = (MARGIN, MARGIN), lambda_heights = None, collapse = 0, collapsed = None):
+  """
+  Lines of the diagram of expr drawn at origin, as (x1, y1, x2, y2).
+  lambda_heights gives the height of the lambda line for each variable free in expr.
+
+  Subterms whose whole drawing fits in a collapse by collapse square aren't walked at all: their
+  area is appended to `collapsed` as (x, y, width, height), and a single line stands in for the
+  wires running up from it to the lambdas outside.
+  """
+  measure(expr)
+  boxes = _boxes
+  # Heights of the enclosing lambda lines for each name, innermost last
+  heights = {name: [y] for (name, y) in (lambda_heights or {}).items()}
+  # Subterms to draw as (expr, x, y), and markers carrying the boxes needed once a subdiagram is done
+  tasks = [(expr, origin[0], origin[1])]
+  while tasks:
+    (node, x, y) = tasks.pop()
+    kind = type(node)
+    if collapse and (kind is Lam or kind is App):
+      # A variable is only its wire, so there'd be nothing to save by collapsing it
+      box = boxes[node]
+      # Lambda lines start at the origin and reach half a gap past the box
+      (width, height) = (box[0] + box[2] + DIAGRAM_GAP[0]/2, box[1] + box[3])
+      if width < collapse and height < collapse:
+        collapsed.append((x, y, width, height))
+        if node.free_vars:
+          binders = [heights.get(name) for name in node.free_vars]
+          if not all(binders):
+            raise Exception(f"Free variable in {node} not found")
+          yield (x + width/2, min(binder[-1] for binder in binders), x + width/2, y)
+        continue
+
+    if kind is Var:
+      # Draw a line from origin up to the lambda line
+      binders = heights.get(node.name)
+      if not binders:
+        raise Exception(f"Free variable {node.name} not found")
+      ox = x + DIAGRAM_GAP[0]/2
+      yield (ox, binders[-1], ox, y)
+
+    elif kind is Lam:
+      heights.setdefault(node.var, []).append(y)
+      tasks.append((("lam", node.var, boxes[node]), x, y))
+      tasks.append((node.expr, x, y + DIAGRAM_GAP[1]))
+
+    elif kind is App:
+      box1 = boxes[node.expr1]
+      tasks.append((("app", box1, boxes[node.expr2]), x, y))
+      tasks.append((node.expr2, x + box1[0] + box1[2] + DIAGRAM_GAP[0], y))
+      tasks.append((node.expr1, x, y))
+
+    elif node[0] == "lam":
+      (_, v, box) = node
+      heights[v].pop()
+      # Draw line over the lambda abstraction
+      yield (x, y, x + box[0] + box[2] + DIAGRAM_GAP[0]/2, y)
+
+    else:
+      (_, box1, box2) = node
+      (x1, y1) = (x + box1[0], y + box1[1])
+      (x2, y2) = (x + box1[0] + box1[2] + DIAGRAM_GAP[0] + box2[0], y + box2[1])
+      max_y = y + max(box1[1] + box1[3], box2[1] + box2[3])
+      # Line connecting bottom lefts of the two boxes
+      yield (x1, max_y, x2 + LINE_THICKNESS/2, max_y)
+      # Since this might be below the existing lines, add a vertical to the left to compensate
+      yield (x1, y1, x1, max_y)
+      # Same for expr2
+      yield (x2, y2, x2, max_y)
+      # A small output line from bottom left down GAP pixels
+      yield (x1, max_y, x1, max_y + DIAGRAM_GAP[1])
+
+def draw_tromp(expr, origin = (MARGIN, MARGIN), lambda_heights = None):
+  """
+  Bounding box and lines of the diagram of expr drawn at origin.
+  Closed terms are cached, so drawing the same term again costs nothing; treat the result as read-only.
+  """
+  if lambda_heights:
+    return _draw(expr, origin, lambda_heights)
+  return _draw_closed(expr, tuple(origin))
+
+@lru_cache(maxsize = CACHED_DIAGRAMS)
+def _draw_closed(expr, origin):
+  return _draw(expr, origin, None)
+
+def _draw(expr, origin, lambda_heights):
+  tracer = instrument.tracer
+  if tracer is not None:
+    start = instrument.clock()
+  lines = tuple(iter_segments(expr, origin, lambda_heights))
+  if tracer is not None:
+    tracer.laid_out(expr, len(lines), instrument.clock() - start)
+  (x, y, width, height) = _boxes[expr]
+  return (BBox(origin[0] + x, origin[1] + y, width, height), lines)
+
+@lru_cache(maxsize = CACHED_DIAGRAMS)
+def draw_lod(expr, collapse, origin = (MARGIN, MARGIN)):
+  """
+  Lines of the diagram of expr with every subterm smaller than collapse shown as a box instead,
+  along with those boxes. Collapsed subterms aren't walked to place lines, but every node is
+  still measured once (only once per node across steps). Collapsing only saves anything where
+  subterms are small: on a Church numeral every subterm of the spine has the rest of the spine
+  in its box, so none of them ever collapses and this costs as much as the full layout.
+  """
+  tracer = instrument.tracer
+  if tracer is not None:
+    start = instrument.clock()
+  collapsed = []
+  lines = tuple(iter_segments(expr, origin, None, collapse, collapsed))
+  if tracer is not None:
+    tracer.laid_out(expr, len(lines), instrument.clock() - start)
+  return (lines, tuple(collapsed))
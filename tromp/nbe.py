@@ -0,0 +1,141 @@
+"""
+Normalization by evaluation.
+
+Terms are evaluated into semantic values: a lambda becomes a closure over its environment and
+a stuck application becomes a neutral value, a variable applied to arguments. Reading a closure
+back applies it to a fresh neutral variable, so the normal form falls out of evaluation without
+ever building the intermediate terms that `beta_reduce` yields one by one.
+
+Arguments are passed as thunks that are updated once forced (call-by-need), so terms that
+normal order reduces to a normal form never diverge here. Both evaluation and readback keep
+their own stacks, so deep terms don't run into Python's recursion limit.
+"""
+from debruijn import Bound, Free, Abs, Apply, to_debruijn, from_debruijn
+
+class Thunk:
+  __slots__ = ("term", "env", "value")
+
+  def __init__(self, term, env, value = None):
+    self.term = term
+    self.env = env
+    self.value = value
+
+class Closure:
+  __slots__ = ("body", "env")
+
+  def __init__(self, body, env):
+    self.body = body
+    self.env = env
+
+class Neutral:
+  """A variable applied to arguments. head is a binder level or a Free node, args a linked list, last argument first."""
+  __slots__ = ("head", "args")
+
+  def __init__(self, head, args):
+    self.head = head
+    self.args = args
+
+"""
+Environments are linked lists (thunk, rest) with index 0 at the front, so extending one
+under a binder is constant time and closures share their tails.
+"""
+
+APPLY, UPDATE = range(2)
+
+def lookup(env, index):
+  for _ in range(index):
+    env = env[1]
+  return env[0]
+
+def evaluate(term, env):
+  frames = []
+  while True:
+    match term:
+      case Bound(index):
+        thunk = lookup(env, index)
+        if thunk.value is None:
+          # Evaluate the thunk, then come back to overwrite it with its value
+          frames.append((UPDATE, thunk))
+          (term, env) = (thunk.term, thunk.env)
+          continue
+        value = thunk.value
+      case Free():
+        value = Neutral(term, None)
+      case Abs(body):
+        value = Closure(body, env)
+      case Apply(fn, arg):
+        match arg:
+          case Bound(index):
+            # No point wrapping a variable in another thunk
+            thunk = lookup(env, index)
+          case Abs(body):
+            thunk = Thunk(None, None, Closure(body, env))
+          case _:
+            thunk = Thunk(arg, env)
+        frames.append((APPLY, thunk))
+        term = fn
+        continue
+      case _:
+        raise Exception(f"Unknown nameless term: {term}")
+
+    # Hand the value back to the waiting frames until one of them needs more evaluation
+    while frames:
+      (kind, thunk) = frames.pop()
+      if kind == UPDATE:
+        thunk.value = value
+        thunk.term = thunk.env = None
+      elif isinstance(value, Closure):
+        (term, env) = (value.body, (thunk, value.env))
+        break
+      else:
+        value = Neutral(value.head, (thunk, value.args))
+    else:
+      return value
+
+def force(thunk):
+  if thunk.value is None:
+    thunk.value = evaluate(thunk.term, thunk.env)
+    thunk.term = thunk.env = None
+  return thunk.value
+
+def quote(value):
+  """Read a value back into a nameless normal form"""
+  results = []
+  tasks = [(value, 0)]
+  while tasks:
+    task = tasks.pop()
+    match task:
+      case (Closure(), depth):
+        # Apply the closure to a fresh variable standing for its binder
+        fresh = Thunk(None, None, Neutral(depth, None))
+        body = evaluate(task[0].body, (fresh, task[0].env))
+        tasks.append(("abs", None))
+        tasks.append((body, depth + 1))
+      case (Neutral(), depth):
+        head = task[0].head
+        args = []
+        spine = task[0].args
+        while spine is not None:
+          args.append(spine[0])
+          spine = spine[1]
+        results.append(Free(head.name) if isinstance(head, Free) else Bound(depth - 1 - head))
+        tasks.append(("spine", len(args)))
+        # args is last-first, so pushing it in order leaves the first argument on top
+        tasks.extend((force(thunk), depth) for thunk in args)
+      case ("abs", _):
+        results.append(Abs(results.pop()))
+      case ("spine", count):
+        args = results[len(results) - count:]
+        del results[len(results) - count:]
+        term = results.pop()
+        for arg in args:
+          term = Apply(term, arg)
+        results.append(term)
+  return results.pop()
+
+def normalize_nameless(term):
+  return quote(evaluate(term, None))
+
+def normalize(expr):
+  """Normal form of expr, alpha-equivalent to the last term beta_reduce yields"""
+  return from_debruijn(normalize_nameless(to_debruijn(expr)))
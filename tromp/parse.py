@@ -0,0 +1,177 @@
+"""
+Parser for lambda terms written the way `pretty_print` writes them.
+
+  λx.x                  a lambda; \\x.x works too, and λx y.x is λx.λy.x
+  f x y                 application, to the left, so this is (f x) y
+  (λx.x) y              parentheses group; a lambda's body extends as far right as it can
+  let k = λx y.x in k   a local definition
+  let i = λx.x;         a definition for the rest of the source, for libraries of terms
+  # comment             to the end of the line
+
+Definitions are substituted into the terms using them, capture-avoiding, and since equal terms
+are one shared node every use of a definition is the same object.
+
+Parsing runs off an explicit stack of open groups, so it takes time linear in the input and no
+nesting is too deep for it.
+"""
+import os
+import re
+from terms import Var, Lam, App
+from core import substitute_all
+
+class ParseError(Exception):
+  def __init__(self, message, source, position):
+    self.position = position
+    self.line = source.count("\n", 0, position) + 1
+    self.column = position - (source.rfind("\n", 0, position) + 1) + 1
+    super().__init__(f"{message} at line {self.line}, column {self.column}")
+
+_TOKEN = re.compile(r"""
+    (?P<space>(?:\s+|\#[^\n]*)+)
+  | (?P<lambda>[λ\\])
+  | (?P<punct>[().;=])
+  | (?P<name>[^\s()λ\\.;=\#]+)
+""", re.VERBOSE)
+
+KEYWORDS = ("let", "in")
+
+def tokenize(source):
+  """(kind, text, position) for each token, ending with ("end", "", len(source))"""
+  # Every character starts some token, so finditer scans the source in one pass without gaps
+  for found in _TOKEN.finditer(source):
+    kind = found.lastgroup
+    if kind == "space":
+      continue
+    text = found.group()
+    if kind == "name" and text in KEYWORDS:
+      kind = "keyword"
+    yield (kind, text, found.start())
+  yield ("end", "", len(source))
+
+class _Group:
+  """
+  A term being read: the application built so far and what it belongs to. kind is "top", "paren",
+  "lambda" (info holds the binders), "let" (the definition, info holds the name) or "in" (the body,
+  info holds the name and the definition).
+  """
+  __slots__ = ("kind", "term", "info", "position")
+
+  def __init__(self, kind, info, position):
+    self.kind = kind
+    self.term = None
+    self.info = info
+    self.position = position
+
+  def add(self, atom):
+    self.term = atom if self.term is None else App(self.term, atom)
+
+def _inline(term, definitions):
+  """term with the free uses of each definition replaced by it"""
+  # Each definition already has the earlier ones inlined, so they can all go in at once
+  used = term.free_vars & definitions.keys()
+  if not used:
+    return term
+  return substitute_all(term, { name: definitions[name] for name in used })
+
+def parse_source(source):
+  """
+  The definitions made with `let name = term;` as a dict, along with the term after them, or
+  None if the source only has definitions.
+  """
+  definitions = {}
+  stack = [_Group("top", None, 0)]
+  tokens = tokenize(source)
+  for (kind, text, position) in tokens:
+    group = stack[-1]
+    if kind == "name":
+      group.add(Var(text))
+
+    elif kind == "lambda":
+      binders = []
+      for (kind, text, binder_position) in tokens:
+        if kind == "name":
+          binders.append(text)
+        elif text == "." and binders:
+          break
+        else:
+          raise ParseError("Expected a variable name" if not binders else "Expected '.' after the lambda's variables", source, binder_position)
+      stack.append(_Group("lambda", binders, position))
+
+    elif text == "(":
+      stack.append(_Group("paren", None, position))
+
+    elif text == "let":
+      (name_kind, name, name_position) = next(tokens)
+      if name_kind != "name":
+        raise ParseError("Expected a name to define", source, name_position)
+      (_, equals, equals_position) = next(tokens)
+      if equals != "=":
+        raise ParseError("Expected '=' after the name", source, equals_position)
+      stack.append(_Group("let", name, position))
+
+    elif text in (")", "in", ";") or kind == "end":
+      # Lambdas and let bodies run until whatever closes the group they're in
+      while stack[-1].kind in ("lambda", "in"):
+        group = stack.pop()
+        if group.term is None:
+          raise ParseError("Missing body", source, position)
+        if group.kind == "lambda":
+          term = group.term
+          for binder in reversed(group.info):
+            term = Lam(binder, term)
+        else:
+          (name, value) = group.info
+          term = _inline(group.term, { name: value })
+        stack[-1].add(term)
+      group = stack[-1]
+
+      if text == ")":
+        if group.kind != "paren":
+          raise ParseError("Unmatched ')'", source, position)
+        if group.term is None:
+          raise ParseError("Empty parentheses", source, position)
+        stack.pop()
+        stack[-1].add(group.term)
+      elif kind == "end":
+        if group.kind != "top":
+          raise ParseError("Unclosed '('" if group.kind == "paren" else "Unfinished let", source, group.position)
+      elif group.kind != "let":
+        raise ParseError(f"Unexpected '{text}'", source, position)
+      elif group.term is None:
+        raise ParseError(f"Missing definition of {group.info}", source, position)
+      elif text == "in":
+        stack.pop()
+        stack.append(_Group("in", (group.info, group.term), group.position))
+      elif stack[-2].kind != "top" or stack[-2].term is not None:
+        raise ParseError("Definitions ending in ';' have to come before the term", source, group.position)
+      else:
+        stack.pop()
+        definitions[group.info] = _inline(group.term, definitions)
+
+    else:
+      raise ParseError(f"Unexpected '{text}'", source, position)
+
+  term = stack[0].term
+  return (definitions, None if term is None else _inline(term, definitions))
+
+def parse(source):
+  """The term in source, with any definitions before it substituted in"""
+  (_, term) = parse_source(source)
+  if term is None:
+    raise ParseError("No term to parse", source, len(source))
+  return term
+
+def parse_definitions(source):
+  """Just the definitions in a library of `let name = term;` lines"""
+  return parse_source(source)[0]
+
+def load(path):
+  with open(path, encoding = "utf-8") as file:
+    return parse_source(file.read())
+
+def parse_argument(argument):
+  """The term in the source file named by argument if there is one, otherwise the term written out in argument"""
+  if os.path.isfile(argument):
+    with open(argument, encoding = "utf-8") as file:
+      return parse(file.read())
+  return parse(argument)
@@ -0,0 +1,91 @@
+"""
+Segment arrays and a batch rasterizer for Tromp diagrams.
+
+Every line in a Tromp diagram is horizontal or vertical, so a thick line is just a filled
+rectangle of pixels. Rather than drawing the lines one call at a time, the rectangles are
+added into a difference array in one go and two cumulative sums turn that into coverage,
+so the cost is one NumPy pass over the segments plus one over the pixels.
+
+Pixels match what `pygame.draw.line` produces for the same segments and thickness.
+Requires NumPy; `main` falls back to drawing line by line without it.
+"""
+from itertools import chain
+import numpy as np
+from layout import MARGIN, LINE_THICKNESS, iter_segments
+
+def segment_array(expr, origin = (MARGIN, MARGIN), lambda_heights = None):
+  """The lines of `draw_tromp` as an (n, 4) float array of x1, y1, x2, y2"""
+  flat = np.fromiter(chain.from_iterable(iter_segments(expr, origin, lambda_heights)), dtype = np.float64)
+  return flat.reshape(-1, 4)
+
+def lines_to_array(lines):
+  """Segment array for lines already laid out by `draw_tromp`"""
+  return np.array(lines, dtype = np.float64).reshape(-1, 4)
+
+def segment_lines(segments):
+  """List of 4-tuples, the form `draw_tromp` returns, for code that wants the old view"""
+  return [tuple(line) for line in segments.tolist()]
+
+def segment_rects(segments, thickness = LINE_THICKNESS):
+  """Pixel rectangles covered by each segment, as an (n, 4) int array of top, left, bottom, right (exclusive)"""
+  # pygame truncates coordinates to whole pixels before drawing
+  pixels = np.floor(segments).astype(np.int64)
+  (x1, y1, x2, y2) = pixels.T
+  vertical = x1 == x2
+  if not np.all(vertical | (y1 == y2)):
+    raise Exception("Only horizontal and vertical segments can be rasterized")
+  # The thickness spreads across the line, one pixel more on the far side when it's even
+  before = (thickness - 1) // 2
+  after = thickness - before
+  top = np.where(vertical, np.minimum(y1, y2), y1 - before)
+  bottom = np.where(vertical, np.maximum(y1, y2) + 1, y1 + after)
+  left = np.where(vertical, x1 - before, np.minimum(x1, x2))
+  right = np.where(vertical, x1 + after, np.maximum(x1, x2) + 1)
+  return np.stack((top, left, bottom, right), axis = 1)
+
+def coverage(segments, shape, thickness = LINE_THICKNESS):
+  """
+  Pixels covered by the segments, cropped to the area they touch: a boolean mask along with the
+  (top, left) of that area within an image of the given (height, width).
+  """
+  (height, width) = shape
+  rects = segment_rects(segments, thickness)
+  top = np.clip(rects[:, 0], 0, height)
+  left = np.clip(rects[:, 1], 0, width)
+  bottom = np.clip(rects[:, 2], 0, height)
+  right = np.clip(rects[:, 3], 0, width)
+  visible = (top < bottom) & (left < right)
+  if not visible.any():
+    return (np.zeros((0, 0), dtype = bool), 0, 0)
+  (top, left, bottom, right) = (top[visible], left[visible], bottom[visible], right[visible])
+
+  # Only the area the rectangles touch needs summing
+  (row, col) = (top.min(), left.min())
+  (top, bottom, left, right) = (top - row, bottom - row, left - col, right - col)
+  (rows, cols) = (bottom.max(), right.max())
+
+  # Mark each rectangle's corners, so that summing down and across fills it in
+  stride = cols + 1
+  corners = np.concatenate((top * stride + left, top * stride + right, bottom * stride + left, bottom * stride + right))
+  signs = np.repeat(np.array([1, -1, -1, 1], dtype = np.int32), len(top))
+  counts = np.bincount(corners, weights = signs, minlength = (rows + 1) * stride).astype(np.int32)
+  sums = counts.reshape(rows + 1, stride).cumsum(axis = 0).cumsum(axis = 1)
+  return (sums[:rows, :cols] > 0, row, col)
+
+def rasterize(segments, shape, thickness = LINE_THICKNESS):
+  """Boolean (height, width) mask of the pixels covered by the segments"""
+  (mask, row, col) = coverage(segments, shape, thickness)
+  image = np.zeros(shape, dtype = bool)
+  image[row:row + mask.shape[0], col:col + mask.shape[1]] = mask
+  return image
+
+def blit_segments(surface, segments, color = (0, 0, 0), thickness = LINE_THICKNESS):
+  """Draw the segments onto a pygame surface in one batch"""
+  import pygame
+  (width, height) = surface.get_size()
+  (mask, row, col) = coverage(segments, (height, width), thickness)
+  # surfarray indexes pixels as [x, y]
+  pixels = pygame.surfarray.pixels2d(surface)
+  area = pixels[col:col + mask.shape[1], row:row + mask.shape[0]]
+  area[mask.T] = surface.map_rgb(color)
+  del area, pixels
@@ -0,0 +1,154 @@
+"""
+Headless rendering of reduction sequences.
+
+Every step of `beta_reduce` (or every nth) is rasterized with NumPy and written out as PNG
+frames or a single animated PNG, without opening a window. The reduction itself is sequential,
+but laying out and rasterizing each frame is independent of the others, so frames are spread
+across a process pool.
+
+  python render.py "(λx y z.x z (y z)) (λx y.x) (λx y.x)" --out frames/
+  python render.py pred.lam --apng pred.png --every 2
+
+The term is written in the syntax parse.py reads, or is the term in a source file of that syntax.
+"""
+import argparse
+import os
+import struct
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import blc
+from layout import MARGIN, DIAGRAM_GAP, LINE_THICKNESS, measure
+from raster import segment_array, rasterize
+from bounded import Reduction
+from parse import parse_argument, ParseError
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GREEN = (0, 128, 0)
+# Palette indices of the frame colors; the final normal form is drawn in green as in the viewer
+PALETTE = (WHITE, BLACK, GREEN)
+
+def reduction_frames(expr, every = 1, limit = None):
+  """
+  Every `every`th term of the reduction of expr as (step, expr, final), always ending with the
+  last term reached. final is true when that last term is a normal form, rather than where the
+  step limit cut off the reduction or where it started going round a cycle.
+  """
+  reduction = Reduction(expr, max_steps = limit)
+  previous = None
+  for (step, current) in enumerate(reduction):
+    if previous is not None and (step - 1) % every == 0:
+      yield (step - 1, previous, False)
+    previous = current
+    last = step
+  yield (last, previous, reduction.result.normalized)
+
+def canvas_size(exprs):
+  """A (width, height) that fits the diagram of every expr drawn at the margin"""
+  width = height = 0
+  for expr in exprs:
+    (x, y, w, h) = measure(expr)
+    # Lambda lines reach half a gap past the box on the right
+    width = max(width, x + w + DIAGRAM_GAP[0]/2)
+    height = max(height, y + h)
+  return (int(width + 2 * MARGIN + LINE_THICKNESS), int(height + 2 * MARGIN + LINE_THICKNESS))
+
+def frame_data(expr, size, final):
+  """Compressed PNG image data for one frame, as palette indices"""
+  (width, height) = size
+  mask = rasterize(segment_array(expr), (height, width))
+  image = np.zeros((height, width + 1), dtype = np.uint8)
+  # Each row starts with its filter type, 0 for none
+  image[:, 1:][mask] = 2 if final else 1
+  return zlib.compress(image.tobytes(), 6)
+
+def _frame_data(job):
+  # Pickling a term recurses through its nodes, so deep terms would overflow the stack on their way
+  # to a worker. Frames are always closed, and their diagrams don't depend on names, so they travel as BLC.
+  (data, size, final) = job
+  return frame_data(blc.decode(data), size, final)
+
+def chunk(kind, data):
+  return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def png_header(size):
+  (width, height) = size
+  # 8 bit palette color, default compression, filtering and no interlacing
+  return (b"\x89PNG\r\n\x1a\n"
+          + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+          + chunk(b"PLTE", bytes(value for color in PALETTE for value in color)))
+
+def write_png(path, size, data):
+  with open(path, "wb") as out:
+    out.write(png_header(size) + chunk(b"IDAT", data) + chunk(b"IEND", b""))
+
+def write_apng(path, size, frames, count, delay = 100):
+  """Write count frames of compressed image data into one animated PNG, showing each for delay milliseconds"""
+  (width, height) = size
+  with open(path, "wb") as out:
+    out.write(png_header(size))
+    # Loop forever
+    out.write(chunk(b"acTL", struct.pack(">II", count, 0)))
+    sequence = 0
+    for (index, data) in enumerate(frames):
+      out.write(chunk(b"fcTL", struct.pack(">IIIIIHHBB", sequence, width, height, 0, 0, delay, 1000, 0, 0)))
+      sequence += 1
+      if index == 0:
+        # The first frame doubles as the still image for viewers without APNG support
+        out.write(chunk(b"IDAT", data))
+      else:
+        out.write(chunk(b"fdAT", struct.pack(">I", sequence) + data))
+        sequence += 1
+    out.write(chunk(b"IEND", b""))
+
+def render(expr, out_dir = None, apng = None, every = 1, limit = 1000, workers = None, delay = 100):
+  """Render the reduction of expr, returning the number of frames written"""
+  frames = list(reduction_frames(expr, every, limit))
+  size = canvas_size(expr for (_, expr, _) in frames)
+  jobs = [(expr, size, final) for (_, expr, final) in frames]
+
+  if workers == 1:
+    results = (frame_data(*job) for job in jobs)
+    pool = None
+  else:
+    jobs = [(blc.encode(expr), size, final) for (expr, size, final) in jobs]
+    pool = ProcessPoolExecutor(workers)
+    results = pool.map(_frame_data, jobs, chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1))))
+  try:
+    if apng is not None:
+      write_apng(apng, size, results, len(jobs), delay)
+    else:
+      os.makedirs(out_dir, exist_ok = True)
+      for ((step, _, _), data) in zip(frames, results):
+        write_png(os.path.join(out_dir, f"frame{step:05}.png"), size, data)
+  finally:
+    if pool is not None:
+      pool.shutdown()
+  return len(jobs)
+
+def run(argv = None):
+  parser = argparse.ArgumentParser(description = "Render the reduction of a lambda term to PNG frames")
+  parser.add_argument("term", help = "the term, e.g. '(λx.x x) λy.y', or a file holding one")
+  output = parser.add_mutually_exclusive_group(required = True)
+  output.add_argument("--out", help = "directory to write numbered PNG frames to")
+  output.add_argument("--apng", help = "animated PNG file to write every frame to")
+  parser.add_argument("--every", type = int, default = 1, help = "render only every nth step (the last step is always rendered)")
+  parser.add_argument("--limit", type = int, default = 1000, help = "stop after this many steps")
+  parser.add_argument("--workers", type = int, default = None, help = "number of processes (default: one per CPU)")
+  parser.add_argument("--delay", type = int, default = 100, help = "milliseconds per frame in the animation")
+  args = parser.parse_args(argv)
+  if args.every < 1:
+    parser.error("--every must be at least 1")
+
+  try:
+    expr = parse_argument(args.term)
+  except ParseError as error:
+    parser.error(str(error))
+  count = render(expr, args.out, args.apng, args.every, args.limit, args.workers, args.delay)
+  print(f"Wrote {count} frames to {args.apng or args.out}", file = sys.stderr)
+
+if __name__ == "__main__":
+  run()
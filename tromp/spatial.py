@@ -0,0 +1,161 @@
+"""
+A hierarchical grid over a diagram's segments, so that drawing a viewport only looks at what's in it.
+
+Each segment is filed exactly once, at the level whose cells are at least as large as the segment
+and in the cell holding its top left end, so the index stays linear in the number of segments
+however long the wires get. A segment then lies within its cell and the next one along each axis,
+so a query looks one cell back on every level. Levels double in cell size, so there are only as
+many as the diagram is long in octaves of the base cell.
+"""
+import math
+from functools import lru_cache
+from layout import DIAGRAM_GAP, LINE_THICKNESS, CACHED_DIAGRAMS, draw_tromp, draw_lod
+
+# Subterms drawn smaller than this many pixels across are shown as boxes
+LOD_PIXELS = 3
+
+class SegmentGrid:
+  def __init__(self, lines, cell = 64):
+    self.lines = lines
+    self.cell = cell
+    # Indices of the segments filed under each cell, per level
+    self.levels = {}
+    # Range of cell coordinates that hold anything on each level, so queries never walk empty space
+    self.bounds = {}
+    for (index, (x1, y1, x2, y2)) in enumerate(lines):
+      extent = max(abs(x2 - x1), abs(y2 - y1))
+      level = 0
+      size = cell
+      while size < extent:
+        level += 1
+        size *= 2
+      (cx, cy) = (int(min(x1, x2) // size), int(min(y1, y2) // size))
+      cells = self.levels.get(level)
+      if cells is None:
+        cells = self.levels[level] = {}
+        self.bounds[level] = [cx, cy, cx, cy]
+      else:
+        bounds = self.bounds[level]
+        bounds[:] = (min(bounds[0], cx), min(bounds[1], cy), max(bounds[2], cx), max(bounds[3], cy))
+      cells.setdefault((cx, cy), []).append(index)
+
+  def query(self, left, top, right, bottom):
+    """Segments that touch the rectangle, in layout order"""
+    found = []
+    for (level, cells) in self.levels.items():
+      bounds = self.bounds[level]
+      size = self.cell * 2 ** level
+      # A segment reaches at most one cell past the one it's filed under
+      (cx0, cy0) = (max(int(left // size) - 1, bounds[0]), max(int(top // size) - 1, bounds[1]))
+      (cx1, cy1) = (min(int(right // size), bounds[2]), min(int(bottom // size), bounds[3]))
+      if cx0 > cx1 or cy0 > cy1:
+        continue
+      if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(cells):
+        for cx in range(cx0, cx1 + 1):
+          for cy in range(cy0, cy1 + 1):
+            indices = cells.get((cx, cy))
+            if indices:
+              found.extend(indices)
+      else:
+        # Far zoomed out the range holds more cells than there are entries
+        for ((cx, cy), indices) in cells.items():
+          if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+            found.extend(indices)
+    lines = self.lines
+    found.sort()
+    return [line for line in (lines[index] for index in found)
+            if min(line[0], line[2]) <= right and max(line[0], line[2]) >= left
+            and min(line[1], line[3]) <= bottom and max(line[1], line[3]) >= top]
+
+@lru_cache(maxsize = CACHED_DIAGRAMS)
+def segment_grid(expr, collapse = 0):
+  """Grid over the lines of the diagram of expr, with subterms smaller than collapse left out"""
+  return SegmentGrid(draw_lod(expr, collapse)[0] if collapse else draw_tromp(expr)[1])
+
+@lru_cache(maxsize = CACHED_DIAGRAMS)
+def box_grid(expr, collapse):
+  """Grid over the boxes standing in for subterms smaller than collapse, as (x1, y1, x2, y2)"""
+  return SegmentGrid([(x, y, x + width, y + height) for (x, y, width, height) in draw_lod(expr, collapse)[1]])
+
+class View:
+  """
+  Which part of the diagram is on screen: the diagram point at the top left corner and the
+  number of screen pixels per diagram unit. Subterms smaller than `detail` pixels are drawn as
+  boxes; 0 draws everything. Views are immutable so they can key cached frames.
+  """
+  __slots__ = ("x", "y", "scale", "detail")
+
+  def __init__(self, x = 0, y = 0, scale = 1, detail = LOD_PIXELS):
+    object.__setattr__(self, "x", x)
+    object.__setattr__(self, "y", y)
+    object.__setattr__(self, "scale", scale)
+    object.__setattr__(self, "detail", detail)
+
+  def __setattr__(self, name, value):
+    raise AttributeError("Views are immutable")
+
+  def _key(self):
+    return (self.x, self.y, self.scale, self.detail)
+
+  def __eq__(self, other):
+    return isinstance(other, View) and self._key() == other._key()
+
+  def __hash__(self):
+    return hash(self._key())
+
+  def __repr__(self):
+    return f"View({self.x}, {self.y}, {self.scale}, {self.detail})"
+
+  def to_screen(self, x, y):
+    return ((x - self.x) * self.scale, (y - self.y) * self.scale)
+
+  def to_diagram(self, x, y):
+    return (x / self.scale + self.x, y / self.scale + self.y)
+
+  def panned(self, dx, dy):
+    """Move the view by dx, dy screen pixels"""
+    return View(self.x - dx / self.scale, self.y - dy / self.scale, self.scale, self.detail)
+
+  def zoomed(self, factor, around = (0, 0)):
+    """Scale by factor, keeping the diagram point under the screen point `around` in place"""
+    (x, y) = self.to_diagram(*around)
+    scale = self.scale * factor
+    return View(x - around[0] / scale, y - around[1] / scale, scale, self.detail)
+
+  def with_detail(self, detail):
+    return View(self.x, self.y, self.scale, detail)
+
+  def thickness(self):
+    return max(1, round(LINE_THICKNESS * self.scale))
+
+  def collapse(self):
+    """
+    Diagram size below which subterms are collapsed at this zoom, or 0 for none. It's rounded
+    down to a power of two so that zooming only relays out the diagram now and then.
+    """
+    if not self.detail:
+      return 0
+    size = self.detail / self.scale
+    # No subterm is narrower than a gap
+    if size <= DIAGRAM_GAP[0]:
+      return 0
+    return 2 ** math.floor(math.log2(size))
+
+  def _visible(self, grid, size):
+    (left, top) = self.to_diagram(0, 0)
+    (right, bottom) = self.to_diagram(*size)
+    # Thick lines reach a little past their coordinates
+    reach = LINE_THICKNESS
+    scale = self.scale
+    (x0, y0) = (self.x, self.y)
+    return [((x1 - x0) * scale, (y1 - y0) * scale, (x2 - x0) * scale, (y2 - y0) * scale)
+            for (x1, y1, x2, y2) in grid.query(left - reach, top - reach, right + reach, bottom + reach)]
+
+  def visible_lines(self, expr, size):
+    """Segments of the diagram of expr that touch a screen of the given size, in screen coordinates"""
+    return self._visible(segment_grid(expr, self.collapse()), size)
+
+  def visible_boxes(self, expr, size):
+    """Boxes standing in for collapsed subterms that touch the screen, as screen (x1, y1, x2, y2)"""
+    collapse = self.collapse()
+    return self._visible(box_grid(expr, collapse), size) if collapse else []
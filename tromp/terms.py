@@ -0,0 +1,192 @@
+"""
+Hash-consed lambda term nodes.
+
+Every distinct term is built exactly once: constructing a node whose fields match a live
+node hands back the existing object. Identical subterms are therefore a single shared object,
+equality is an identity check, and each node carries metadata computed once when it is built:
+its size, depth, free variables and whether it contains a redex. Since a node is built
+once per distinct term, so is its metadata, and questions that used to need a walk over
+the subterm become attribute lookups.
+
+Term nodes still behave like the old read-only dicts ("type", "var", "expr", ...), so item
+access and mapping patterns in `match` keep working, but traversals should prefer class
+patterns such as `case Lam(v, body)`, which skip the mapping lookups.
+"""
+import threading
+import weakref
+from collections.abc import Mapping
+
+# Weak references to the live nodes, keyed by (class, *fields). Entries vanish once nothing references
+# the node. This is a WeakValueDictionary without the Python-level method calls, since building nodes
+# is the hot path.
+_nodes = {}
+# Held while a dead node's entry is removed or replaced, so that threads building terms at once
+# still get one node per term. Reentrant, since dropping a reference while holding it can run
+# `_forget` in the same thread.
+_lock = threading.RLock()
+
+class _Ref(weakref.ref):
+  __slots__ = ("key",)
+
+def _forget(ref, nodes = _nodes, lock = _lock):
+  with lock:
+    # A new node may have taken the key since this one died, and that entry has to stay
+    if nodes.get(ref.key) is ref:
+      del nodes[ref.key]
+
+def _replace(key, existing, ref):
+  """The node registered under key, or that of ref if the one registered has died"""
+  with _lock:
+    while True:
+      node = existing()
+      if node is not None:
+        return node
+      # The dead node's `_forget` may not have run yet
+      if _nodes.get(key) is existing:
+        _nodes[key] = ref
+        return ref()
+      existing = _nodes.setdefault(key, ref)
+      if existing is ref:
+        return ref()
+
+class Node:
+  __slots__ = ("__weakref__",)
+  _fields = ()
+
+  def __new__(cls, *fields):
+    key = (cls, *fields)
+    ref = _nodes.get(key)
+    if ref is not None:
+      node = ref()
+      if node is not None:
+        return node
+    node = object.__new__(cls)
+    for name, value in zip(cls._fields, fields):
+      object.__setattr__(node, name, value)
+    node._build()
+    ref = _Ref(node, _forget)
+    ref.key = key
+    # setdefault is atomic, so of threads building the same term at once only one registers its node
+    # and the others hand that one back
+    existing = _nodes.setdefault(key, ref)
+    if existing is not ref:
+      return _replace(key, existing, ref)
+    return node
+
+  def _build(self):
+    pass
+
+  def __setattr__(self, name, value):
+    raise AttributeError(f"{type(self).__name__} nodes are immutable")
+
+  # Equal terms are the same object, so object's identity based __eq__ and __hash__ are exactly
+  # right, and being implemented in C they keep hashing the (class, *fields) keys cheap.
+
+  def __reduce__(self):
+    # Unpickling goes back through the constructor so loaded terms are interned too
+    return (type(self), tuple(getattr(self, name) for name in self._fields))
+
+  def __copy__(self):
+    return self
+
+  def __deepcopy__(self, memo):
+    return self
+
+  def __repr__(self):
+    parts = []
+    # Nodes still to print and literal text, in reverse order
+    stack = [self]
+    while stack:
+      item = stack.pop()
+      if isinstance(item, Node):
+        parts.append(type(item).__name__ + "(")
+        stack.append(")")
+        for (i, name) in reversed(list(enumerate(item._fields))):
+          field = getattr(item, name)
+          stack.append(field if isinstance(field, Node) else repr(field))
+          if i > 0:
+            stack.append(", ")
+      else:
+        parts.append(item)
+    return "".join(parts)
+
+class Term(Node):
+  """
+  The read-only mapping interface of the old dict terms. Term is registered as a Mapping
+  rather than inheriting from it, which keeps isinstance checks and class patterns on plain
+  classes instead of going through ABCMeta.
+  """
+  __slots__ = ("size", "depth", "free_vars", "has_redex")
+
+  def __getitem__(self, key):
+    if key == "type" or key in self._fields:
+      return getattr(self, key)
+    raise KeyError(key)
+
+  def get(self, key, default = None):
+    if key == "type" or key in self._fields:
+      return getattr(self, key)
+    return default
+
+  def __contains__(self, key):
+    return key == "type" or key in self._fields
+
+  def __iter__(self):
+    return iter(("type",) + self._fields)
+
+  def __len__(self):
+    return len(self._fields) + 1
+
+  def keys(self):
+    return ("type",) + self._fields
+
+  def values(self):
+    return tuple(self[key] for key in self.keys())
+
+  def items(self):
+    return tuple((key, self[key]) for key in self.keys())
+
+Mapping.register(Term)
+
+class Var(Term):
+  __slots__ = ("name",)
+  __match_args__ = _fields = ("name",)
+  type = "var"
+
+  def _build(self):
+    object.__setattr__(self, "size", 1)
+    object.__setattr__(self, "depth", 1)
+    object.__setattr__(self, "free_vars", frozenset((self.name,)))
+    object.__setattr__(self, "has_redex", False)
+
+class Lam(Term):
+  __slots__ = ("var", "expr")
+  __match_args__ = _fields = ("var", "expr")
+  type = "lambda"
+
+  def _build(self):
+    body = self.expr
+    object.__setattr__(self, "size", 1 + body.size)
+    object.__setattr__(self, "depth", 1 + body.depth)
+    object.__setattr__(self, "free_vars", body.free_vars - {self.var} if self.var in body.free_vars else body.free_vars)
+    object.__setattr__(self, "has_redex", body.has_redex)
+
+class App(Term):
+  __slots__ = ("expr1", "expr2")
+  __match_args__ = _fields = ("expr1", "expr2")
+  type = "app"
+
+  def _build(self):
+    (expr1, expr2) = (self.expr1, self.expr2)
+    object.__setattr__(self, "size", 1 + expr1.size + expr2.size)
+    object.__setattr__(self, "depth", 1 + max(expr1.depth, expr2.depth))
+    object.__setattr__(self, "free_vars", _union(expr1.free_vars, expr2.free_vars))
+    object.__setattr__(self, "has_redex", type(expr1) is Lam or expr1.has_redex or expr2.has_redex)
+
+def _union(free_vars1, free_vars2):
+  # Reuse a child's set whenever the union adds nothing to it, so most nodes share their sets
+  if free_vars2 <= free_vars1:
+    return free_vars1
+  if free_vars1 <= free_vars2:
+    return free_vars2
+  return free_vars1 | free_vars2
@@ -1,5 +1,5 @@
 import pytest
-from main import var, lam, app, alpha_equivalent
+from core import var, lam, app, alpha_equivalent
 
 def test_var_equivalence():
     assert alpha_equivalent(var("x"), var("x"))
@@ -0,0 +1,134 @@
+from core import *
+from combinators import s_com, k_com, i_com, omega, y_com, pred, add, mul
+from bounded import reduce_bounded, NORMAL_FORM, STEP_LIMIT, CYCLE
+from batch import term_key, NormalFormCache, reuse_subterms, normalize_batch
+
+def test_term_key():
+    assert term_key(lam("x", var("x"))) == term_key(lam("y", var("y")))
+    assert term_key(lam("x", var("y"))) == term_key(lam("z", var("y")))
+    assert term_key(lam("x", var("y"))) != term_key(lam("x", var("z")))
+    assert term_key(app(var("a"), var("b"))) != term_key(app(var("b"), var("a")))
+    assert term_key(k_com) != term_key(lamn(["x", "y"], var("y")))
+
+def test_cache_round_trip(tmp_path):
+    path = tmp_path / "cache.db"
+    with NormalFormCache(str(path)) as cache:
+        cache.put(appn(s_com, k_com, k_com), i_com, 4)
+        assert cache.get(appn(s_com, k_com, k_com)) == (i_com, 4)
+        assert cache.get(s_com) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+    # Entries outlive the connection, and alpha-equivalent terms find them
+    with NormalFormCache(str(path)) as cache:
+        (term, steps) = cache.get(appn(lamn(["a", "b", "c"], appn(var("a"), var("c"), app(var("b"), var("c")))), k_com, k_com))
+        assert alpha_equivalent(term, i_com) and steps == 4
+        assert len(cache) == 1
+
+def test_eviction_by_entries():
+    cache = NormalFormCache(":memory:", max_entries = 2)
+    for n in range(3):
+        cache.put(nth_iter(n), nth_iter(n))
+    assert len(cache) == 2
+    assert cache.get(nth_iter(0)) is None
+    # Using an entry makes it the most recent
+    assert cache.get(nth_iter(1)) is not None
+    cache.put(nth_iter(3), nth_iter(3))
+    assert cache.get(nth_iter(2)) is None
+    assert cache.get(nth_iter(1)) is not None
+
+def test_eviction_by_bytes():
+    cache = NormalFormCache(":memory:")
+    cache.put(nth_iter(100), nth_iter(100))
+    one = cache.size_bytes()
+    cache = NormalFormCache(":memory:", max_bytes = 3 * one)
+    for n in range(100, 110):
+        cache.put(nth_iter(n), nth_iter(n))
+        assert cache.size_bytes() <= 3 * one
+    assert len(cache) >= 2
+    assert cache.get(nth_iter(109)) is not None
+
+def test_running_totals(tmp_path):
+    path = str(tmp_path / "cache.db")
+    with NormalFormCache(path, max_entries = 5, max_bytes = 2000) as cache:
+        for n in range(40):
+            cache.put(nth_iter(n % 25), nth_iter(n))
+            assert (cache.count, cache.bytes) == (len(cache), cache.size_bytes())
+            assert cache.count <= 5 and cache.bytes <= 2000
+    # Totals are read back from what is stored
+    with NormalFormCache(path) as cache:
+        assert (cache.count, cache.bytes) == (len(cache), cache.size_bytes())
+        cache.clear()
+        assert (cache.count, cache.bytes) == (0, 0)
+
+def test_reuse_subterms():
+    cache = NormalFormCache(":memory:")
+    three = appn(add, nth_iter(1), nth_iter(2))
+    cache.put(three, nth_iter(3))
+    expr = lam("y", appn(var("y"), three, three))
+    assert reuse_subterms(expr, cache, min_size = 1) is lam("y", appn(var("y"), nth_iter(3), nth_iter(3)))
+    # Too small, or the term itself
+    assert reuse_subterms(expr, cache, min_size = 1000) is expr
+    assert reuse_subterms(three, cache, min_size = 1) is three
+
+def test_reuse_subterms_on_deep_spines():
+    # Every application on the spine is closed, and each is keyed from hashes already worked out below it
+    spine = i_com
+    for _ in range(5000):
+        spine = app(i_com, spine)
+    cache = NormalFormCache(":memory:")
+    cache.put(spine.expr2.expr2, i_com)
+    assert reuse_subterms(spine, cache, min_size = 1) is app(i_com, app(i_com, i_com))
+    # Probing subterms doesn't count as hits or misses
+    assert (cache.hits, cache.misses) == (0, 0)
+
+def test_normalize_batch():
+    exprs = [appn(pred, nth_iter(n)) for n in range(1, 5)] + [appn(mul, nth_iter(2), nth_iter(3))]
+    results = normalize_batch(exprs, workers = 2)
+    for (result, expected) in zip(results, [nth_iter(n) for n in range(4)] + [nth_iter(6)]):
+        assert result.reason == NORMAL_FORM
+        assert alpha_equivalent(result.term, expected)
+    assert results[0].steps == last_steps(exprs[0])
+
+def last_steps(expr):
+    return sum(1 for _ in beta_reduce(expr)) - 1
+
+def test_any_variable_names():
+    # Names that pretty_print text couldn't carry, including a keyword and a free variable named like a binder
+    exprs = [app(lam("x", var("x")), var("in")), app(var("a.b"), var("x=1")), app(lam("x", lam("z", var("x"))), var("z"))]
+    expected = [var("in"), app(var("a.b"), var("x=1")), lam("z1", var("z"))]
+    assert reduce_bounded(exprs[2]).term is expected[2]
+    cache = NormalFormCache(":memory:")
+    for workers in (1, 2):
+        results = normalize_batch(exprs, workers = workers)
+        assert [result.term for result in results] == expected
+    normalize_batch(exprs, cache, workers = 1)
+    assert [cache.get(expr)[0] for expr in exprs] == expected
+
+def test_limits():
+    (cycle, limit) = normalize_batch([app(omega, omega), app(y_com, var("g"))], workers = 1, max_steps = 20)
+    assert cycle.reason == CYCLE
+    assert limit.reason == STEP_LIMIT and limit.steps == 20
+
+def test_cached_batches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    exprs = [appn(pred, nth_iter(4)), appn(s_com, k_com, k_com), appn(lamn(["a", "b", "c"], appn(var("a"), var("c"), app(var("b"), var("c")))), k_com, k_com)]
+    with NormalFormCache(path) as cache:
+        first = normalize_batch(exprs, cache, workers = 1)
+        # The alpha-equivalent pair is reduced once
+        assert len(cache) == 2
+    with NormalFormCache(path) as cache:
+        second = normalize_batch(exprs, cache, workers = 1)
+        assert cache.misses == 0
+    for (a, b) in zip(first, second):
+        assert alpha_equivalent(a.term, b.term) and a.steps == b.steps
+
+def test_batch_reuses_cached_subterms():
+    cache = NormalFormCache(":memory:")
+    big = appn(pred, nth_iter(30))
+    (result,) = normalize_batch([big], cache, workers = 1)
+    (again,) = normalize_batch([lam("y", app(var("y"), big))], cache, workers = 1)
+    # Only the outer lambda is left to look at, since pred 30 is already normalized, so steps leaves
+    # out the ones pred 30 took
+    assert again.steps == 0
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert again.term is lam("y", app(var("y"), result.term))
+    assert result.steps > 0
@@ -0,0 +1,41 @@
+import io
+from core import *
+from bench import Case, cases, measure, scaling_exponent, compare, run_cases, deep_term, wide_term, ENGINES
+from combinators import pred
+
+def test_terms():
+    assert alpha_equivalent(deep_term(10, "_"), nth_iter(10))
+    assert wide_term(8).size == 2 + 15
+    assert alpha_equivalent(wide_term(7), wide_term(7, "_"))
+
+def test_engines_agree():
+    expr = app(pred, nth_iter(5))
+    for normalize_with in ENGINES.values():
+        assert alpha_equivalent(normalize_with(expr), nth_iter(4))
+
+def test_measure():
+    case = Case("identity", (1, 2), lambda n: lambda: [0] * (n * 100000))
+    result = measure(case, 2, repeat = 1)
+    assert (result["case"], result["n"]) == ("identity", 2)
+    assert result["seconds"] > 0
+    assert result["peak_bytes"] >= 8 * 200000
+
+def test_every_case_runs():
+    for case in cases():
+        case.setup(case.sizes[0])()
+
+def test_scaling_exponent():
+    quadratic = [{ "n": n, "seconds": n * n * 1e-6 } for n in (10, 100, 1000)]
+    assert abs(scaling_exponent(quadratic) - 2) < 1e-9
+    assert scaling_exponent(quadratic[:1]) is None
+
+def test_compare():
+    baseline = [{ "case": "a", "n": 1, "seconds": 1.0 }, { "case": "b", "n": 1, "seconds": 1.0 }]
+    results = [{ "case": "a", "n": 1, "seconds": 1.1 }, { "case": "b", "n": 1, "seconds": 2.0 }, { "case": "c", "n": 1, "seconds": 9.0 }]
+    assert compare(results, baseline) == [("b", 1, 2.0)]
+
+def test_run_cases():
+    out = io.StringIO()
+    results = run_cases(["alpha_equivalent wide"], quick = True, repeat = 1, out = out)
+    assert [result["n"] for result in results] == [1000, 10000]
+    assert "scaling" in out.getvalue()
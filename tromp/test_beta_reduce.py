@@ -1,4 +1,5 @@
-from main import *
+from core import *
+from bounded import Reduction
 
 # Define test expressions
 omega = lam("x", app(var("x"), var("x")))
@@ -8,13 +9,11 @@ print("Testing beta reduction for Y combinator")
 print("Original Y combinator:", pretty_print(y_com))
 
 print("\nReduction steps:")
-for i, expr in enumerate(beta_reduce(y_com)):
+# Stop after 5 steps, since the Y combinator never reaches a normal form
+reduction = Reduction(y_com, max_steps = 5)
+for i, expr in enumerate(reduction):
     print(f"Step {i}: {pretty_print(expr)}")
-
-    # Stop after 5 steps to prevent potential infinite loop
-    if i >= 5:
-        print("Stopping after 5 steps...")
-        break
+print(f"Stopped: {reduction.result.reason}")
 
 print("\nTesting beta reduction for a simple expression: (λx.x) y")
 simple_expr = app(lam("x", var("x")), var("y"))
@@ -0,0 +1,60 @@
+import pytest
+from core import *
+from combinators import s_com, k_com, i_com, omega, y_com, succ, pred
+from debruijn import to_debruijn
+from blc import encode_bits, encode, decode, decode_nameless, BitReader, read_term, write_terms, iter_terms
+
+def test_known_encodings():
+    # From Tromp's paper
+    assert encode_bits(i_com) == "0010"
+    assert encode_bits(k_com) == "0000110"
+    assert encode_bits(s_com) == "00000001011110100111010"
+    assert encode(i_com) == bytes([0b00100000])
+
+@pytest.mark.parametrize("expr", [s_com, k_com, i_com, omega, y_com, appn(pred, nth_iter(7)), lamn(["a", "b"], app(var("b"), var("a")))])
+def test_round_trip(expr):
+    data = encode(expr)
+    assert len(data) == -(-len(encode_bits(expr)) // 8)
+    assert decode_nameless(data) is to_debruijn(expr)
+    assert alpha_equivalent(decode(data), expr)
+
+def test_deep_round_trip():
+    expr = nth_iter(5000)
+    assert decode_nameless(encode(expr)) is to_debruijn(expr)
+
+def test_free_variables_rejected():
+    with pytest.raises(Exception):
+        encode(app(var("x"), var("y")))
+
+def test_bad_data():
+    with pytest.raises(Exception):
+        # λ.2 refers past its only binder
+        decode(bytes([0b00110000]))
+    with pytest.raises(Exception):
+        # Runs out halfway through an application
+        decode(bytes([0b01001000]))
+
+def test_reader_across_chunks():
+    exprs = [appn(succ, nth_iter(n)) for n in range(30)]
+    data = b"".join(encode(expr) for expr in exprs)
+    reader = BitReader(data, chunk = 3)
+    decoded = []
+    while not reader.at_end():
+        decoded.append(read_term(reader, nameless = True))
+        reader.align()
+    assert decoded == [to_debruijn(expr) for expr in exprs]
+
+def test_file_of_terms(tmp_path):
+    path = tmp_path / "terms.blc"
+    exprs = [s_com, k_com, i_com, y_com] + [nth_iter(n) for n in range(50)]
+    write_terms(path, exprs)
+    assert [to_debruijn(expr) for expr in iter_terms(path)] == [to_debruijn(expr) for expr in exprs]
+    assert list(iter_terms(path, nameless = True)) == [to_debruijn(expr) for expr in exprs]
+    empty = tmp_path / "empty.blc"
+    write_terms(empty, [])
+    assert list(iter_terms(empty)) == []
+
+def test_decoded_names_match_from_debruijn():
+    from debruijn import from_debruijn
+    for expr in [s_com, y_com, appn(pred, nth_iter(3))]:
+        assert decode(encode(expr)) is from_debruijn(to_debruijn(expr))
@@ -0,0 +1,69 @@
+from core import *
+from combinators import s_com, k_com, omega, y_com, succ, pred
+from bounded import Reduction, reduce_bounded, NORMAL_FORM, STEP_LIMIT, SIZE_LIMIT, TIME_LIMIT, CYCLE
+
+def test_normal_form():
+    expr = appn(s_com, k_com, k_com)
+    result = reduce_bounded(expr)
+    assert result.reason == NORMAL_FORM and result.normalized
+    assert result.steps == len(list(beta_reduce(expr))) - 1
+    assert alpha_equivalent(result.term, lam("z", var("z")))
+
+def test_reduction_yields_the_same_terms_as_beta_reduce():
+    expr = appn(pred, nth_iter(4))
+    assert list(Reduction(expr)) == list(beta_reduce(expr))
+
+def test_omega_omega_is_a_cycle():
+    result = reduce_bounded(app(omega, omega))
+    assert result.reason == CYCLE and result.divergent
+    assert (result.steps, result.cycle_start) == (1, 0)
+
+def test_cycle_up_to_alpha_equivalence():
+    # (λx.x x) (λy.y y) reduces to (λy.y y) (λy.y y), which only matches up to renaming
+    expr = app(omega, lam("y", app(var("y"), var("y"))))
+    assert reduce_bounded(expr).reason == CYCLE
+    # Cycles that take a few steps to come round are caught too
+    loop = lam("x", lam("y", appn(var("y"), var("x"), var("y"))))
+    expr = appn(loop, loop, loop)
+    result = reduce_bounded(expr, max_steps = 50)
+    assert result.reason == CYCLE
+    assert result.steps - result.cycle_start >= 1
+
+def test_step_limit():
+    growing = app(y_com, var("g"))
+    result = reduce_bounded(growing, max_steps = 20)
+    assert result.reason == STEP_LIMIT and not result.divergent
+    assert result.steps == 20
+    assert len(list(Reduction(growing, max_steps = 20))) == 21
+
+def test_size_limit():
+    result = reduce_bounded(app(y_com, var("g")), max_size = 100)
+    assert result.reason == SIZE_LIMIT
+    assert result.term.size > 100
+    # Only a term that could still be reduced is cut off
+    result = reduce_bounded(nth_iter(20), max_size = 30)
+    assert (result.reason, result.steps) == (NORMAL_FORM, 0)
+
+def test_time_limit():
+    result = reduce_bounded(app(y_com, var("g")), timeout = 0.05)
+    assert result.reason == TIME_LIMIT
+    assert result.steps > 0
+
+def test_cycle_detection_can_be_turned_off():
+    result = reduce_bounded(app(omega, omega), max_steps = 10, detect_cycles = False)
+    assert (result.reason, result.steps) == (STEP_LIMIT, 10)
+
+def test_normal_form_within_limits():
+    result = reduce_bounded(appn(succ, nth_iter(3)), max_steps = 100, max_size = 1000, timeout = 10)
+    assert result.normalized
+    assert alpha_equivalent(result.term, nth_iter(4))
+
+def test_cycle_detection_only_converts_repeated_shapes(monkeypatch):
+    import bounded
+    converted = []
+    monkeypatch.setattr(bounded, "to_debruijn", lambda term: converted.append(term) or to_debruijn(term))
+    assert reduce_bounded(appn(pred, nth_iter(20))).normalized
+    # Every step of pred differs in size, depth or free variables, so none needs its nameless form
+    assert converted == []
+    assert reduce_bounded(app(omega, omega)).reason == CYCLE
+    assert len(converted) == 2
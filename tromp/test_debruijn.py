@@ -0,0 +1,56 @@
+from core import var, lam, app, lamn, alpha_equivalent, pretty_print
+from debruijn import Bound, Free, Abs, Apply, to_debruijn, from_debruijn, shift, beta
+
+def test_to_debruijn():
+    assert to_debruijn(lam("x", var("x"))) is Abs(Bound(0))
+    assert to_debruijn(lam("x", lam("y", app(var("x"), var("y"))))) is Abs(Abs(Apply(Bound(1), Bound(0))))
+
+    # Shadowing refers to the innermost binder
+    assert to_debruijn(lam("x", lam("x", var("x")))) is Abs(Abs(Bound(0)))
+
+    # Free variables keep their names
+    assert to_debruijn(lam("x", app(var("x"), var("z")))) is Abs(Apply(Bound(0), Free("z")))
+
+def test_alpha_equivalent_terms_share_nameless_form():
+    assert to_debruijn(lam("x", lam("y", var("x")))) is to_debruijn(lam("a", lam("b", var("a"))))
+    assert to_debruijn(lam("x", var("z"))) is not to_debruijn(lam("x", var("w")))
+
+def test_from_debruijn_round_trip():
+    terms = [
+        lam("x", var("x")),
+        lamn(["f", "x"], app(var("f"), app(var("f"), var("x")))),
+        lam("x", lam("x", app(var("x"), var("y")))),
+        app(lam("x", app(var("x"), var("x"))), lam("x", app(var("x"), var("x")))),
+    ]
+    for term in terms:
+        assert alpha_equivalent(from_debruijn(to_debruijn(term)), term)
+
+def test_from_debruijn_avoids_free_names():
+    # Generated binder names must not capture the free variable x
+    result = from_debruijn(Abs(Apply(Bound(0), Free("x"))))
+    assert result["var"] != "x"
+    assert alpha_equivalent(result, lam("a", app(var("a"), var("x"))))
+
+def test_shift():
+    assert shift(Bound(0), 2) is Bound(2)
+    assert shift(Abs(Apply(Bound(0), Bound(1))), 1) is Abs(Apply(Bound(0), Bound(2)))
+    # Closed terms are returned as they are
+    closed = Abs(Bound(0))
+    assert shift(closed, 5) is closed
+
+def test_beta():
+    # (λx.x) y
+    assert beta(Bound(0), Free("y")) is Free("y")
+
+    # (λx.λy.x) y does not capture the free y
+    result = beta(Abs(Bound(1)), Free("y"))
+    assert result is Abs(Free("y"))
+    assert pretty_print(from_debruijn(result)) == "λx.y"
+
+    # Argument moved under a binder is shifted: λa.(λx.λy.x) a  ->  λa.λy.a
+    redex = to_debruijn(lam("a", app(lam("x", lam("y", var("x"))), var("a"))))
+    assert Abs(beta(redex.body.fn.body, redex.body.arg)) is to_debruijn(lam("a", lam("y", var("a"))))
+
+    # Loose indices of the body drop by one once the binder is consumed: λa.(λx.a) z  ->  λa.a
+    redex = to_debruijn(lam("a", app(lam("x", var("a")), var("z"))))
+    assert Abs(beta(redex.body.fn.body, redex.body.arg)) is Abs(Bound(0))
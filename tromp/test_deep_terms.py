@@ -0,0 +1,39 @@
+from main import *
+from combinators import pred
+from debruijn import to_debruijn, from_debruijn
+from nbe import normalize
+from graph import graph_normalize
+
+# Deep enough that any traversal using Python recursion would hit the recursion limit
+DEPTH = 5000
+
+def test_construction():
+    assert nth_iter(DEPTH).size == 2 * DEPTH + 3
+    assert appn(*[var("x")] * DEPTH).size == 2 * DEPTH - 1
+    assert lamn(["x"] * DEPTH, var("x")).size == DEPTH + 1
+
+def test_traversals():
+    expr = nth_iter(DEPTH)
+    assert get_free_vars(expr) == set()
+    assert get_bound_vars(expr) == {"f", "x"}
+    assert make_all_lambda_vars_unique(expr) is expr
+    assert alpha_equivalent(expr, lamn(["g", "y"], rename_var(rename_var(expr["expr"]["expr"], "f", "g"), "x", "y")))
+    assert substitute(expr["expr"]["expr"], "f", var("g")) is rename_var(expr["expr"]["expr"], "f", "g")
+    assert pretty_print(expr).count("(") == DEPTH - 1
+    (bbox, lines) = draw_tromp(expr, (MARGIN, MARGIN), {})
+    # One line per variable, four per application and one per lambda
+    assert len(lines) == (DEPTH + 1) + 4 * DEPTH + 2
+    assert alpha_equivalent(from_debruijn(to_debruijn(expr)), expr)
+    assert repr(expr).startswith("Lam('f', Lam('x', App(Var('f'), App(")
+
+def test_deep_lambda_nesting():
+    expr = lamn([f"x{i}" for i in range(DEPTH)], var("x0"))
+    assert alpha_equivalent(make_all_lambda_vars_unique(expr), expr)
+    assert to_debruijn(expr).size == DEPTH + 1
+    assert pretty_print(expr).endswith(".x0")
+
+def test_reduction():
+    expr = appn(pred, nth_iter(DEPTH))
+    assert find_redex(expr) is not None
+    assert alpha_equivalent(normalize(expr), nth_iter(DEPTH - 1))
+    assert alpha_equivalent(graph_normalize(expr), nth_iter(DEPTH - 1))
@@ -0,0 +1,48 @@
+import pytest
+from core import var, lam, app, lamn, appn, nth_iter, alpha_equivalent, beta_reduce
+from combinators import s_com, k_com, i_com, omega, succ, pred
+from graph import graph_reduce, graph_normalize, GraphReducer, to_graph, readback
+
+def last(steps):
+    *_, result = steps
+    return result
+
+def test_readback_round_trip():
+    expr = appn(s_com, k_com, lam("a", app(var("a"), var("free"))))
+    assert readback(to_graph(expr)) == expr
+
+def test_first_step_is_the_input():
+    expr = app(i_com, var("y"))
+    assert alpha_equivalent(next(graph_reduce(expr)), expr)
+
+@pytest.mark.parametrize("expr", [
+    app(i_com, var("y")),
+    appn(s_com, k_com, k_com),
+    appn(succ, nth_iter(3)),
+    appn(pred, nth_iter(3)),
+    appn(pred, appn(succ, nth_iter(4))),
+    # Free variable with the same name as a binder must not be captured
+    app(lam("y", lam("x", app(var("y"), var("x")))), var("x")),
+])
+def test_agrees_with_beta_reduce(expr):
+    result = last(beta_reduce(expr))
+    assert alpha_equivalent(last(graph_reduce(expr)), result)
+    assert alpha_equivalent(graph_normalize(expr), result)
+
+def test_arguments_are_shared():
+    # n + n copies the unevaluated argument twice; call-by-need only reduces it once
+    double = lamn(["n", "f", "x"], appn(var("n"), var("f"), appn(var("n"), var("f"), var("x"))))
+    expr = app(double, appn(pred, nth_iter(10)))
+    reducer = GraphReducer(expr)
+    for _ in reducer.steps():
+        pass
+    assert alpha_equivalent(reducer.readback(), nth_iter(18))
+    assert reducer.step_count < len(list(beta_reduce(expr))) - 1
+
+def test_large_numeral():
+    assert alpha_equivalent(graph_normalize(appn(pred, nth_iter(300))), nth_iter(299))
+
+def test_diverging_term_keeps_stepping():
+    steps = graph_reduce(app(omega, omega))
+    for _ in range(10):
+        assert alpha_equivalent(next(steps), app(omega, omega))
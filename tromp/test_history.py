@@ -0,0 +1,48 @@
+import random
+import pytest
+from core import *
+from combinators import y_com, succ, pred
+from bounded import Reduction
+from history import History, diff, replace_at
+
+def test_diff_and_replace():
+    old = lam("f", app(var("f"), app(app(lam("x", var("x")), var("y")), var("z"))))
+    new = lam("f", app(var("f"), app(var("y"), var("z"))))
+    (directions, replacement) = diff(old, new)
+    assert len(directions) == 3
+    assert replacement is var("y")
+    assert replace_at(old, directions, replacement) is new
+    assert diff(old, old) == (b"", old)
+    assert replace_at(old, *diff(old, var("q"))) is var("q")
+
+@pytest.mark.parametrize("checkpoint_every", [1, 3, 64])
+def test_every_step_comes_back(checkpoint_every):
+    steps = list(beta_reduce(appn(pred, nth_iter(6))))
+    history = History(steps[0], checkpoint_every)
+    history.extend(steps[1:])
+    assert len(history) == len(steps)
+    assert list(history) == steps
+    order = list(range(len(steps)))
+    random.Random(1).shuffle(order)
+    for step in order:
+        assert history[step] is steps[step]
+    assert history[-1] is steps[-1]
+    with pytest.raises(IndexError):
+        history[len(steps)]
+
+def test_scrubbing_backwards():
+    steps = list(beta_reduce(appn(succ, appn(succ, nth_iter(5)))))
+    history = History(steps[0], 4)
+    history.extend(steps[1:])
+    for step in reversed(range(len(steps))):
+        assert history[step] is steps[step]
+
+def test_memory_grows_with_the_changes():
+    # A long reduction of a growing term: every step adds a little, but the terms keep getting bigger
+    reduction = Reduction(app(y_com, var("g")), max_steps = 300)
+    terms = iter(reduction)
+    history = History(next(terms), 32)
+    history.extend(terms)
+    total = sum(history[step].size for step in range(len(history)))
+    assert history.changed_nodes() < total / 20
+    assert len(history.checkpoints) == 300 // 32 + 1
@@ -0,0 +1,60 @@
+import io
+from core import *
+from combinators import s_com, k_com, succ, power
+import instrument
+from instrument import Tracer, tracing, read_trace
+from jets import jet_reduce
+from layout import draw_tromp, draw_lod
+
+def test_steps():
+    records = []
+    with tracing() as tracer:
+        tracer.on_step(records.append)
+        terms = list(beta_reduce(appn(s_com, k_com, k_com)))
+    assert instrument.tracer is None
+    assert tracer.counters["steps"] == len(terms) - 1 == len(records)
+    for (record, before, after) in zip(records, terms, terms[1:]):
+        assert (record["size_before"], record["size_after"]) == (before.size, after.size)
+        assert record["seconds"] >= 0
+    # The first redex is S K, the function of the whole term
+    assert records[0]["path"] == "f"
+    assert tracer.counters["substitutions"] == len(records)
+    assert tracer.counters["nodes_copied"] == sum(record["copied"] for record in records) > 0
+    assert tracer.timings["reduce"] > 0
+
+def test_renames():
+    # Substituting y under λy has to rename the binder
+    with tracing() as tracer:
+        substitute(lam("y", app(var("x"), var("y"))), "x", var("y"))
+    assert (tracer.counters["substitutions"], tracer.counters["renames"], tracer.counters["nodes_copied"]) == (1, 1, 2)
+
+def test_alpha_and_layout():
+    with tracing() as tracer:
+        assert alpha_equivalent(lam("x", var("x")), lam("y", var("y")))
+        (_, lines) = draw_tromp(appn(s_com, k_com, k_com, k_com), (0, 0), {"unused": 0})
+        draw_lod(nth_iter(30), 1000)
+    assert tracer.timings["alpha"] > 0
+    assert tracer.counters["layouts"] == 2
+    assert tracer.counters["segments"] >= len(lines)
+
+def test_jet_steps():
+    with tracing() as tracer:
+        steps = list(jet_reduce(appn(power, nth_iter(2), app(succ, nth_iter(2)))))
+    assert tracer.counters["jet_steps"] == 1
+    assert tracer.counters["steps"] == len(steps) - 1
+
+def test_json_lines(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    with open(path, "w") as out, tracing(Tracer(out)):
+        steps = len(list(beta_reduce(app(succ, nth_iter(2))))) - 1
+        draw_tromp(nth_iter(7), (0, 0), {"unused": 0})
+    events = read_trace(path)
+    assert [event["event"] for event in events] == ["step"] * steps + ["layout", "summary"]
+    assert events[-1]["steps"] == steps
+    assert [event["step"] for event in events[:steps]] == list(range(1, steps + 1))
+
+def test_disabled():
+    out = io.StringIO()
+    tracer = Tracer(out)
+    list(beta_reduce(app(succ, nth_iter(2))))
+    assert tracer.counters["steps"] == 0 and out.getvalue() == ""
@@ -0,0 +1,88 @@
+from core import *
+from combinators import *
+from jets import numeral_value, boolean_value, church, accelerate, jet_reduce, register, NUMERAL
+from bounded import reduce_bounded
+
+def last(terms):
+    for term in terms:
+        pass
+    return term
+
+def test_values():
+    for n in range(5):
+        assert numeral_value(nth_iter(n)) == n
+    assert numeral_value(lamn(["g", "y"], app(var("g"), app(var("g"), var("y"))))) == 2
+    assert numeral_value(lamn(["f", "f"], app(var("f"), var("f")))) is None
+    assert numeral_value(lamn(["f", "x"], app(var("x"), var("f")))) is None
+    assert numeral_value(i_com) is None
+    assert boolean_value(true) is True
+    assert boolean_value(false) is False
+    assert boolean_value(lamn(["a", "a"], var("a"))) is False
+    assert boolean_value(s_com) is None
+    assert church(3) is nth_iter(3)
+    assert church(True) is true
+
+def test_jets_agree_with_beta_reduction():
+    n = nth_iter
+    cases = [
+        app(succ, n(2)), app(pred, n(3)), app(pred, n(0)),
+        appn(add, n(2), n(3)), appn(mul, n(2), n(3)), appn(power, n(2), n(3)), appn(power, n(3), n(0)),
+        app(is_zero, n(0)), app(is_zero, n(2)),
+        appn(and_com, true, false), appn(or_com, false, true), app(not_com, false),
+        # Results feeding further jets, and jets under lambdas and in arguments
+        appn(add, app(succ, n(1)), appn(mul, n(2), n(2))),
+        lam("y", appn(var("y"), app(succ, n(1)))),
+        appn(app(is_zero, app(pred, n(1))), n(4), n(5)),
+    ]
+    for expr in cases:
+        expected = last(beta_reduce(expr))
+        assert alpha_equivalent(last(jet_reduce(expr)), expected), pretty_print(expr)
+
+def test_every_jet_on_small_values():
+    numerals = [nth_iter(n) for n in range(4)]
+    for m in numerals:
+        for combinator in (succ, pred, is_zero):
+            expr = app(combinator, m)
+            assert alpha_equivalent(last(jet_reduce(expr)), last(beta_reduce(expr)))
+        for n in numerals:
+            for combinator in (add, mul, power):
+                expr = appn(combinator, m, n)
+                assert alpha_equivalent(last(jet_reduce(expr)), last(beta_reduce(expr)))
+    for p in (true, false):
+        assert alpha_equivalent(last(jet_reduce(app(not_com, p))), last(beta_reduce(app(not_com, p))))
+        for q in (true, false):
+            for combinator in (and_com, or_com):
+                expr = appn(combinator, p, q)
+                assert alpha_equivalent(last(jet_reduce(expr)), last(beta_reduce(expr)))
+
+def test_jets_after_beta_steps():
+    # succ only meets a numeral once the outer redex is contracted
+    twice = lamn(["s", "n"], app(var("s"), app(var("s"), var("n"))))
+    expr = appn(twice, succ, nth_iter(3))
+    assert alpha_equivalent(last(jet_reduce(expr)), nth_iter(5))
+
+def test_steps_saved():
+    expr = appn(power, nth_iter(3), nth_iter(3))
+    steps = list(jet_reduce(expr))
+    assert len(steps) == 2
+    assert numeral_value(steps[-1]) == 27
+    result = reduce_bounded(appn(mul, appn(power, nth_iter(2), nth_iter(12)), nth_iter(3)), jets = True)
+    assert result.normalized and result.steps == 1
+    assert numeral_value(result.term) == 3 * 4096
+
+def test_alpha_equivalent_combinators():
+    renamed = lamn(["a", "g", "y"], app(var("g"), appn(var("a"), var("g"), var("y"))))
+    assert accelerate(app(renamed, nth_iter(4))) is nth_iter(5)
+
+def test_unknown_arguments_are_left_alone():
+    expr = lam("m", app(succ, var("m")))
+    assert accelerate(expr) is expr
+    expr = appn(add, nth_iter(1), k_com)
+    assert accelerate(expr) is expr
+
+def test_register():
+    double = lamn(["n", "f", "x"], appn(var("n"), var("f"), appn(var("n"), var("f"), var("x"))))
+    expr = app(double, nth_iter(21))
+    assert accelerate(expr) is expr
+    register(double, (NUMERAL,), lambda n: 2 * n)
+    assert accelerate(expr) is nth_iter(42)
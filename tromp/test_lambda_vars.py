@@ -1,5 +1,5 @@
 import pytest
-from main import var, lam, app, make_all_lambda_vars_unique, get_free_vars
+from core import var, lam, app, make_all_lambda_vars_unique, get_free_vars
 
 def test_make_unique_simple_lambda():
     # Test with a single lambda
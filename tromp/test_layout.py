@@ -0,0 +1,84 @@
+import pytest
+from main import *
+from combinators import s_com, k_com, y_com, succ, pred
+import layout
+
+def reference_draw(expr, origin, lambda_heights):
+    # Straightforward recursive layout, without any caching
+    match expr:
+        case Lam(v, body):
+            (bbox, lines) = reference_draw(body, (origin[0], origin[1] + DIAGRAM_GAP[1]), {**lambda_heights, v: origin[1]})
+            lines.append((origin[0], origin[1], bbox.x + bbox.width + DIAGRAM_GAP[0]/2, origin[1]))
+            return (bbox, lines)
+        case App(expr1, expr2):
+            (bbox1, lines1) = reference_draw(expr1, origin, lambda_heights)
+            (bbox2, lines2) = reference_draw(expr2, (bbox1.x + bbox1.width + DIAGRAM_GAP[0], origin[1]), lambda_heights)
+            max_y = max(bbox1.y + bbox1.height, bbox2.y + bbox2.height)
+            lines = lines1 + lines2 + [
+                (bbox1.x, max_y, bbox2.x + LINE_THICKNESS/2, max_y),
+                (bbox1.x, bbox1.y, bbox1.x, max_y),
+                (bbox2.x, bbox2.y, bbox2.x, max_y),
+                (bbox1.x, max_y, bbox1.x, max_y + DIAGRAM_GAP[1]),
+            ]
+            return (BBox.from_points((bbox1.x, bbox1.y), (bbox2.x + bbox2.width, max_y + DIAGRAM_GAP[1])), lines)
+        case Var(name):
+            ox = origin[0] + DIAGRAM_GAP[0]/2
+            return (BBox(ox, origin[1], 0, 0), [(ox, lambda_heights[name], ox, origin[1])])
+
+def assert_same_diagram(actual, expected):
+    (bbox, lines) = actual
+    (expected_bbox, expected_lines) = expected
+    assert (bbox.x, bbox.y, bbox.width, bbox.height) == (expected_bbox.x, expected_bbox.y, expected_bbox.width, expected_bbox.height)
+    assert list(lines) == expected_lines
+
+@pytest.mark.parametrize("expr", [
+    s_com,
+    appn(s_com, k_com, k_com),
+    y_com,
+    appn(pred, nth_iter(4)),
+    lam("x", app(lam("x", var("x")), var("x"))),
+])
+def test_matches_reference(expr):
+    assert_same_diagram(draw_tromp(expr), reference_draw(expr, (MARGIN, MARGIN), {}))
+    assert_same_diagram(draw_tromp(expr, (100, 40)), reference_draw(expr, (100, 40), {}))
+
+def test_free_variables():
+    expr = app(var("f"), lam("x", app(var("x"), var("g"))))
+    heights = {"f": 3, "g": 5}
+    assert_same_diagram(draw_tromp(expr, (MARGIN, MARGIN), heights), reference_draw(expr, (MARGIN, MARGIN), heights))
+    with pytest.raises(Exception):
+        draw_tromp(expr)
+
+def test_binders_do_not_leak_between_calls():
+    draw_tromp(lam("y", var("y")))
+    with pytest.raises(Exception):
+        draw_tromp(var("y"))
+
+def subterms(expr):
+    seen = set()
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if node not in seen:
+            seen.add(node)
+            if isinstance(node, Lam):
+                stack.append(node.expr)
+            elif isinstance(node, App):
+                stack.extend((node.expr1, node.expr2))
+    return seen
+
+def test_reduction_steps_only_measure_new_nodes():
+    steps = beta_reduce(appn(succ, nth_iter(12)))
+    previous = next(steps)
+    draw_tromp(previous)
+    for expr in steps:
+        before = len(layout._boxes)
+        draw_tromp(expr)
+        # Nodes shared with the previous step are already measured
+        new_nodes = subterms(expr) - subterms(previous)
+        assert len(layout._boxes) - before <= len(new_nodes) < expr.size
+        assert_same_diagram(draw_tromp(expr), reference_draw(expr, (MARGIN, MARGIN), {}))
+        previous = expr
+
+def test_cached_result():
+    assert draw_tromp(y_com) is draw_tromp(y_com)
@@ -0,0 +1,31 @@
+import pytest
+from core import var, lam, app, appn, nth_iter, alpha_equivalent, beta_reduce
+from combinators import s_com, k_com, i_com, omega, succ, pred
+from nbe import normalize
+
+def last(steps):
+    *_, result = steps
+    return result
+
+@pytest.mark.parametrize("expr", [
+    var("z"),
+    app(i_com, var("y")),
+    appn(s_com, k_com, k_com),
+    appn(succ, nth_iter(3)),
+    appn(pred, nth_iter(3)),
+    appn(pred, appn(succ, nth_iter(4))),
+    lam("a", app(lam("b", app(var("b"), var("a"))), var("c"))),
+    app(lam("y", lam("x", app(var("y"), var("x")))), var("x")),
+])
+def test_agrees_with_beta_reduce(expr):
+    assert alpha_equivalent(normalize(expr), last(beta_reduce(expr)))
+
+def test_unused_diverging_argument_is_never_evaluated():
+    # K I (ω ω) has a normal form even though its argument doesn't
+    assert alpha_equivalent(normalize(appn(k_com, i_com, app(omega, omega))), i_com)
+
+def test_free_variables_are_kept():
+    assert alpha_equivalent(normalize(app(lam("x", app(var("f"), var("x"))), var("y"))), app(var("f"), var("y")))
+
+def test_large_numeral():
+    assert alpha_equivalent(normalize(appn(pred, nth_iter(300))), nth_iter(299))
@@ -0,0 +1,43 @@
+from core import var, lam, app, lamn, appn, nth_iter, alpha_equivalent, beta_reduce, beta_reduce_step, find_redex
+
+omega = lam("x", app(var("x"), var("x")))
+succ = lamn(["n", "f", "x"], appn(var("f"), appn(var("n"), var("f"), var("x"))))
+
+def test_find_redex_leftmost_outermost():
+    inner = app(lam("y", var("y")), var("z"))
+    outer = app(lam("x", inner), var("w"))
+    (path, redex) = find_redex(app(outer, inner))
+    assert redex is outer
+    assert len(path) == 1
+
+    # Redexes under lambdas are found too
+    (path, redex) = find_redex(lam("a", app(var("a"), inner)))
+    assert redex is inner
+    assert [child for (_, child) in path] == ["expr", "expr2"]
+
+    assert find_redex(lam("x", app(var("x"), var("y")))) is None
+
+def test_step_rebuilds_only_the_path():
+    untouched = app(var("g"), lamn(["p", "q"], app(var("q"), var("p"))))
+    expr = app(untouched, app(lam("y", var("y")), var("z")))
+    reduced = beta_reduce_step(expr)
+    assert reduced == app(untouched, var("z"))
+    assert reduced["expr1"] is untouched
+
+def test_normal_form_is_unchanged():
+    expr = lam("x", app(var("x"), var("y")))
+    assert beta_reduce_step(expr) is expr
+
+def test_beta_reduce_to_normal_form():
+    *_, result = beta_reduce(app(succ, nth_iter(2)))
+    assert alpha_equivalent(result, nth_iter(3))
+
+def test_beta_reduce_avoids_capture():
+    # (λx.λy.x) y must not become λy.y
+    *_, result = beta_reduce(app(lam("x", lam("y", var("x"))), var("y")))
+    assert alpha_equivalent(result, lam("a", var("y")))
+
+def test_beta_reduce_diverging_term_keeps_stepping():
+    steps = beta_reduce(app(omega, omega))
+    for _ in range(10):
+        assert alpha_equivalent(next(steps), app(omega, omega))
@@ -0,0 +1,118 @@
+import re
+import time
+import pytest
+from core import *
+from combinators import s_com, k_com, i_com, y_com, succ, pred, omega
+from parse import parse, parse_source, parse_definitions, tokenize, ParseError, load
+
+def test_syntax():
+    assert parse("x") is var("x")
+    assert parse("λx.x") is lam("x", var("x"))
+    assert parse("\\x.x") is lam("x", var("x"))
+    assert parse("λx y.x") is lamn(["x", "y"], var("x"))
+    assert parse("f x y") is appn(var("f"), var("x"), var("y"))
+    assert parse("f (x y)") is app(var("f"), app(var("x"), var("y")))
+    assert parse("(λx.x) y") is app(lam("x", var("x")), var("y"))
+    assert parse("λx.x y") is lam("x", app(var("x"), var("y")))
+    assert parse("f λx.x y") is app(var("f"), lam("x", app(var("x"), var("y"))))
+    assert parse("(((x)))") is var("x")
+    assert parse("  x'  x1\n# a comment\n\tx_2 ") is appn(var("x'"), var("x1"), var("x_2"))
+
+def test_round_trip():
+    f = var("f")
+    tricky = [
+        app(app(f, lam("x", var("x"))), var("y")),
+        appn(f, lam("x", var("x")), lam("y", var("y")), var("z")),
+        app(appn(f, app(f, f), lam("x", var("x"))), f),
+        app(app(lam("x", var("x")), lam("y", var("y"))), f),
+    ]
+    for expr in [s_com, k_com, i_com, y_com, succ, pred, omega, nth_iter(7), appn(pred, nth_iter(3))] + tricky:
+        assert alpha_equivalent(parse(pretty_print(expr)), expr)
+
+def test_round_trip_reduction():
+    for expr in beta_reduce(appn(pred, nth_iter(4))):
+        assert parse(pretty_print(expr)) is expr
+
+def test_deep_terms():
+    depth = 20000
+    expr = nth_iter(depth)
+    assert parse(pretty_print(expr)) is expr
+    nested = "(" * depth + "x" + ")" * depth
+    assert parse(nested) is var("x")
+    assert parse("λx." * depth + "x").depth == depth + 1
+
+def test_let():
+    assert parse("let i = λx.x in i i") is app(i_com, i_com)
+    assert parse("let k = λx y.x in let i = λx.x in k i") is app(k_com, i_com)
+    # The body of a let extends as far right as it can, as a lambda's does
+    assert parse("(let i = λx.x in i) y") is app(i_com, var("y"))
+    # Lambdas shadow definitions
+    assert parse("let x = λy.y in λx.x") is lam("x", var("x"))
+
+def test_let_avoids_capture():
+    expr = parse("let f = g y in λy.f y")
+    assert alpha_equivalent(expr, lam("z", app(app(var("g"), var("y")), var("z"))))
+
+def test_definitions():
+    source = """
+    # Combinators
+    let s = λx y z.x z (y z);
+    let k = λx y.x;
+    let i = s k k;
+    i k
+    """
+    (definitions, term) = parse_source(source)
+    assert list(definitions) == ["s", "k", "i"]
+    assert alpha_equivalent(definitions["s"], s_com)
+    assert definitions["i"] is appn(definitions["s"], k_com, k_com)
+    assert term is app(definitions["i"], k_com)
+    assert parse(source) is term
+    assert parse_definitions("let i = λx.x;") == {"i": i_com}
+    assert parse_source("let i = λx.x;") == ({"i": i_com}, None)
+
+def test_libraries_parse_in_linear_time():
+    def library(count):
+        return "let i = λx.x;\n" + "".join(f"let d{n} = λx y.i x y;\n" for n in range(count)) + "d0 i"
+    def seconds(source):
+        # Best of a few runs, to keep the ratio steady
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            parse_source(source)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+    (small, large) = (library(2000), library(8000))
+    # Four times the definitions; quadratic work would take sixteen times as long
+    assert seconds(large) < 8 * seconds(small)
+
+def test_load(tmp_path):
+    path = tmp_path / "lib.lam"
+    path.write_text("let i = λx.x;\nlet k = λx y.x;\nk i\n", encoding = "utf-8")
+    assert load(path) == ({"i": i_com, "k": k_com}, app(k_com, i_com))
+
+def test_tokenize():
+    assert [kind for (kind, _, _) in tokenize("let f = λx.(x) in f;")] == [
+        "keyword", "name", "punct", "lambda", "name", "punct", "punct", "name", "punct", "keyword", "name", "punct", "end"]
+
+@pytest.mark.parametrize(("source", "message", "line", "column"), [
+    ("", "No term", 1, 1),
+    ("(x", "Unclosed '('", 1, 1),
+    ("x)", "Unmatched ')'", 1, 2),
+    ("f ()", "Empty parentheses", 1, 4),
+    ("λ.x", "Expected a variable name", 1, 2),
+    ("λx y", "Expected '.'", 1, 5),
+    ("λx.", "Missing body", 1, 4),
+    ("x\n  = y", "Unexpected '='", 2, 3),
+    ("let = x", "Expected a name", 1, 5),
+    ("let x y", "Expected '='", 1, 7),
+    ("let x = in x", "Missing definition of x", 1, 9),
+    ("let x = y", "Unfinished let", 1, 1),
+    ("f\nlet x = y;", "have to come before", 2, 1),
+    ("(let x = y;)", "have to come before", 1, 2),
+    ("x in y", "Unexpected 'in'", 1, 3),
+])
+def test_errors(source, message, line, column):
+    with pytest.raises(ParseError, match = re.escape(message)) as error:
+        parse(source)
+    assert (error.value.line, error.value.column) == (line, column)
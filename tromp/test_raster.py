@@ -0,0 +1,41 @@
+import os
+import pytest
+np = pytest.importorskip("numpy")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+from main import *
+from combinators import s_com, y_com, pred
+from raster import segment_array, segment_lines, lines_to_array, rasterize, blit_segments
+
+def test_segment_array_matches_lines():
+    expr = appn(pred, nth_iter(5))
+    segments = segment_array(expr)
+    assert segments.shape == (len(draw_tromp(expr)[1]), 4)
+    assert segment_lines(segments) == list(draw_tromp(expr)[1])
+    assert np.array_equal(lines_to_array(draw_tromp(expr)[1]), segments)
+
+def test_empty_segments():
+    assert not rasterize(np.zeros((0, 4)), (10, 10)).any()
+
+@pytest.mark.parametrize("expr", [s_com, y_com, appn(pred, nth_iter(6))])
+def test_same_pixels_as_pygame(expr):
+    size = (600, 200)
+    expected = pygame.Surface(size)
+    expected.fill((255, 255, 255))
+    for line in draw_tromp(expr)[1]:
+        pygame.draw.line(expected, (0, 0, 0), (line[0], line[1]), (line[2], line[3]), LINE_THICKNESS)
+    actual = pygame.Surface(size)
+    actual.fill((255, 255, 255))
+    blit_segments(actual, segment_array(expr))
+    assert np.array_equal(pygame.surfarray.array3d(actual), pygame.surfarray.array3d(expected))
+
+def test_clipped_to_shape():
+    # Partly outside on every side
+    segments = np.array([[-5, 2, 30, 2], [3, -10, 3, 40]], dtype = float)
+    mask = rasterize(segments, (8, 6))
+    assert mask.shape == (8, 6)
+    assert mask[1:5, :].any() and mask[:, 2:6].any()
+
+def test_diagonal_segments_rejected():
+    with pytest.raises(Exception):
+        rasterize(np.array([[0, 0, 5, 5]], dtype = float), (10, 10))
@@ -0,0 +1,79 @@
+import struct
+import zlib
+import pytest
+np = pytest.importorskip("numpy")
+from main import *
+from combinators import s_com, k_com, omega, y_com, pred
+from render import reduction_frames, canvas_size, render, run
+
+def read_chunks(path):
+    data = open(path, "rb").read()
+    assert data.startswith(b"\x89PNG\r\n\x1a\n")
+    position = 8
+    chunks = []
+    while position < len(data):
+        (length,) = struct.unpack(">I", data[position:position + 4])
+        kind = data[position + 4:position + 8]
+        body = data[position + 8:position + 8 + length]
+        (crc,) = struct.unpack(">I", data[position + 8 + length:position + 12 + length])
+        assert crc == zlib.crc32(kind + body)
+        chunks.append((kind, body))
+        position += 12 + length
+    return chunks
+
+def test_reduction_frames():
+    expr = appn(s_com, k_com, k_com)
+    steps = list(beta_reduce(expr))
+    frames = list(reduction_frames(expr))
+    assert [step for (step, _, _) in frames] == list(range(len(steps)))
+    assert [final for (_, _, final) in frames] == [False] * (len(steps) - 1) + [True]
+    assert [step for (step, _, _) in reduction_frames(expr, every = 2)] == sorted(set(range(0, len(steps), 2)) | {len(steps) - 1})
+
+def test_limit_cuts_off_divergent_terms():
+    frames = list(reduction_frames(app(y_com, var("g")), every = 3, limit = 10))
+    assert [step for (step, _, _) in frames] == [0, 3, 6, 9, 10]
+    assert not frames[-1][2]
+
+def test_cycles_end_the_animation():
+    frames = list(reduction_frames(app(omega, omega), limit = 10))
+    assert [step for (step, _, _) in frames] == [0, 1]
+    assert not frames[-1][2]
+
+def test_png_frames(tmp_path):
+    expr = appn(s_com, k_com, k_com)
+    count = render(expr, out_dir = tmp_path, workers = 2)
+    files = sorted(tmp_path.iterdir())
+    assert len(files) == count == len(list(beta_reduce(expr)))
+    (width, height) = canvas_size([expr])
+    chunks = read_chunks(files[-1])
+    assert [kind for (kind, _) in chunks] == [b"IHDR", b"PLTE", b"IDAT", b"IEND"]
+    assert struct.unpack(">II", chunks[0][1][:8]) == (width, height)
+    pixels = np.frombuffer(zlib.decompress(chunks[2][1]), dtype = np.uint8).reshape(height, width + 1)
+    # Filter bytes, then the final frame in green
+    assert not pixels[:, 0].any()
+    assert set(np.unique(pixels[:, 1:])) == {0, 2}
+
+def test_deep_terms_reach_workers(tmp_path):
+    # Terms go to worker processes without pickling, which would recurse once per level
+    expr = app(lamn(["y"], var("y")), lamn(["x"] * 1500, var("x")))
+    assert render(expr, out_dir = tmp_path, workers = 2) == 2
+    assert render(expr, out_dir = tmp_path / "serial", workers = 1) == 2
+    assert (tmp_path / "frame00001.png").read_bytes() == (tmp_path / "serial" / "frame00001.png").read_bytes()
+
+def test_animated_png(tmp_path):
+    path = tmp_path / "pred.png"
+    run([ pretty_print(appn(pred, nth_iter(2))), "--apng", str(path), "--every", "3", "--workers", "1"])
+    kinds = [kind for (kind, _) in read_chunks(path)]
+    count = len(list(reduction_frames(appn(pred, nth_iter(2)), every = 3)))
+    assert kinds.count(b"fcTL") == count
+    assert kinds.count(b"fdAT") == count - 1
+    assert kinds.index(b"IDAT") < kinds.index(b"fdAT")
+
+def test_term_from_a_file(tmp_path):
+    source = tmp_path / "skk.lam"
+    source.write_text("let k = λx y.x;\n(λx y z.x z (y z)) k k\n", encoding = "utf-8")
+    run([str(source), "--out", str(tmp_path / "frames"), "--workers", "1"])
+    assert len(list((tmp_path / "frames").iterdir())) == len(list(beta_reduce(appn(s_com, k_com, k_com))))
+    # Terms are read as lambda terms, never run as Python
+    with pytest.raises(SystemExit):
+        run(["__import__('os').getcwd()", "--out", str(tmp_path / "python"), "--workers", "1"])
@@ -0,0 +1,77 @@
+import math
+import pytest
+from main import *
+from combinators import pred
+from spatial import SegmentGrid, View, segment_grid
+from layout import draw_lod
+
+def touches(line, left, top, right, bottom):
+    (x1, y1, x2, y2) = line
+    return min(x1, x2) <= right and max(x1, x2) >= left and min(y1, y2) <= bottom and max(y1, y2) >= top
+
+@pytest.mark.parametrize("cell", [7, 32, 1000])
+def test_query_finds_every_touching_segment(cell):
+    lines = draw_tromp(appn(pred, nth_iter(8)))[1]
+    grid = SegmentGrid(lines, cell)
+    for rect in [(0, 0, 50, 50), (100, 20, 180, 35), (-100, -100, 5000, 5000), (2000, 2000, 3000, 3000), (60, 60, 60, 60)]:
+        found = grid.query(*rect)
+        assert {line for line in lines if touches(line, *rect)} <= set(found)
+        assert found == [line for line in lines if line in set(found)]
+
+def test_index_is_linear_in_segments():
+    # Numeral wires grow with n, but each segment is still filed only once
+    for n in (500, 4000):
+        lines = draw_tromp(nth_iter(n))[1]
+        grid = SegmentGrid(lines)
+        assert sum(len(indices) for cells in grid.levels.values() for indices in cells.values()) == len(lines)
+        assert len(grid.levels) <= math.log2(n * DIAGRAM_GAP[1]) + 1
+
+def test_empty_grid():
+    assert SegmentGrid([]).query(0, 0, 100, 100) == []
+
+def test_view_round_trip():
+    view = View(10, 20, 2).panned(30, -40).zoomed(1.5, (100, 50))
+    assert view.to_screen(*view.to_diagram(100, 50)) == pytest.approx((100, 50))
+    # The point under the pointer stays put while zooming
+    before = View(10, 20, 2)
+    assert before.zoomed(3, (100, 50)).to_diagram(100, 50) == pytest.approx(before.to_diagram(100, 50))
+    assert View(1, 2, 3) == View(1, 2, 3) and hash(View(1, 2, 3)) == hash(View(1, 2, 3))
+    with pytest.raises(AttributeError):
+        View().x = 5
+
+def test_only_visible_segments_are_drawn():
+    expr = appn(pred, nth_iter(200))
+    total = len(draw_tromp(expr)[1])
+    visible = View().visible_lines(expr, (300, 200))
+    assert 0 < len(visible) < total / 4
+    assert len(View(detail = 0).zoomed(0.01).visible_lines(expr, (300, 200))) == total
+    assert segment_grid(expr) is segment_grid(expr)
+
+def test_nothing_collapses_at_normal_zoom():
+    assert View().collapse() == 0
+    assert View(scale = 0.01, detail = 0).collapse() == 0
+    assert View(scale = 0.01).collapse() == 256
+
+def test_level_of_detail():
+    expr = appn(pred, nth_iter(200))
+    total = len(draw_tromp(expr)[1])
+    (lines, boxes) = draw_lod(expr, 1024)
+    assert 0 < len(lines) < total * 0.8
+    assert len(draw_lod(expr, 4096)[0]) < total / 4
+    assert boxes
+    # Every box stays inside the full diagram, and stands in for something narrower than the threshold
+    (bbox, _) = draw_tromp(expr)
+    for (x, y, width, height) in boxes:
+        assert width < 1024 and height < 1024
+        assert bbox.x - DIAGRAM_GAP[0] <= x and x + width <= bbox.x + bbox.width + DIAGRAM_GAP[0]
+    assert View(scale = 0.002).collapse() == 1024
+    assert len(View(scale = 0.002).visible_boxes(expr, (300, 200))) == len(boxes)
+
+def test_collapsed_free_variables_reach_their_binders():
+    expr = lam("f", lam("x", app(var("f"), app(var("f"), var("x")))))
+    (lines, boxes) = draw_lod(expr, 1000)
+    assert boxes == ((MARGIN, MARGIN, *boxes[0][2:]),)
+    assert lines == ()
+    (lines, boxes) = draw_lod(expr, 40)
+    # One wire per collapsed subterm that mentions f or x
+    assert len(lines) >= len(boxes) > 0
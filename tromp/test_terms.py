@@ -0,0 +1,82 @@
+import gc
+import pickle
+import weakref
+from terms import Var, Lam, App
+from core import var, lam, app
+
+def test_identical_terms_are_shared():
+    assert var("x") is var("x")
+    assert lam("x", app(var("x"), var("y"))) is lam("x", app(var("x"), var("y")))
+
+    # Same structure but different names is a different node
+    assert lam("x", var("x")) is not lam("y", var("y"))
+
+def test_equality_and_hash():
+    expr1 = app(lam("x", var("x")), var("y"))
+    expr2 = app(lam("x", var("x")), var("y"))
+    assert expr1 == expr2
+    assert hash(expr1) == hash(expr2)
+    assert expr1 != app(var("y"), lam("x", var("x")))
+    assert len({expr1, expr2}) == 1
+
+def test_size():
+    assert var("x").size == 1
+    assert lam("x", var("x")).size == 2
+    assert app(lam("x", var("x")), var("y")).size == 4
+
+def test_mapping_interface():
+    expr = lam("x", app(var("x"), var("y")))
+    assert expr["type"] == "lambda"
+    assert expr["var"] == "x"
+    assert expr["expr"]["expr2"]["name"] == "y"
+    assert dict(expr["expr"]) == { "type": "app", "expr1": var("x"), "expr2": var("y") }
+
+    match expr:
+      case { "type": "lambda", "var": v, "expr": { "type": "app" } }:
+        assert v == "x"
+      case _:
+        assert False
+
+def test_class_patterns():
+    match app(lam("x", var("x")), var("y")):
+      case App(Lam(v, Var(name)), arg):
+        assert v == name == "x"
+        assert arg is var("y")
+      case _:
+        assert False
+
+def test_pickle_reinterns():
+    expr = lam("f", lam("x", app(var("f"), var("x"))))
+    assert pickle.loads(pickle.dumps(expr)) is expr
+
+def test_immutable():
+    expr = var("x")
+    try:
+        expr.name = "y"
+        assert False
+    except AttributeError:
+        pass
+
+def test_unreferenced_nodes_are_released():
+    expr = lam("unused_binder", var("unused_binder"))
+    ref = weakref.ref(expr)
+    del expr
+    gc.collect()
+    assert ref() is None
+
+def test_cached_metadata():
+    expr = lam("x", app(app(var("x"), var("y")), lam("z", var("w"))))
+    assert expr.size == 7
+    assert expr.depth == 4
+    assert expr.free_vars == {"y", "w"}
+    assert not expr.has_redex
+
+    redex = app(lam("x", var("x")), var("y"))
+    assert redex.has_redex
+    assert lam("a", app(var("a"), redex)).has_redex
+    assert redex.free_vars == {"y"}
+
+def test_free_var_sets_are_shared():
+    body = app(var("f"), app(var("f"), var("g")))
+    assert body.free_vars is body["expr2"].free_vars
+    assert lam("x", body).free_vars is body.free_vars
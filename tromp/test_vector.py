@@ -0,0 +1,48 @@
+import xml.etree.ElementTree as ET
+import pytest
+from main import *
+from combinators import s_com, y_com, pred
+from vector import merge_collinear, svg_chunks, postscript_chunks, write_svg
+
+def covered(segments):
+    # Half-pixel points along every segment
+    points = set()
+    for (x1, y1, x2, y2) in segments:
+        if x1 == x2:
+            points |= {(x1, y) for y in range(int(2 * min(y1, y2)), int(2 * max(y1, y2)) + 1)}
+        else:
+            points |= {(x, y1) for x in range(int(2 * min(x1, x2)), int(2 * max(x1, x2)) + 1)}
+    return points
+
+def test_merge_collinear():
+    assert list(merge_collinear([(0, 0, 5, 0), (5, 0, 8, 0), (10, 0, 12, 0)])) == [(0, 0, 8, 0), (10, 0, 12, 0)]
+    assert sorted(merge_collinear([(3, 0, 3, 4), (1, 1, 1, 2), (3, 6, 3, 4)])) == [(1, 1, 1, 2), (3, 0, 3, 6)]
+
+@pytest.mark.parametrize("expr", [s_com, y_com, appn(pred, nth_iter(5))])
+def test_merging_keeps_the_same_lines(expr):
+    lines = draw_tromp(expr)[1]
+    merged = list(merge_collinear(iter(lines)))
+    assert len(merged) < len(lines)
+    assert covered(merged) == covered(lines)
+    # A tiny window still gives the same picture
+    assert covered(merge_collinear(iter(lines), window = 1)) == covered(lines)
+
+def test_svg():
+    expr = appn(pred, nth_iter(5))
+    root = ET.fromstring("".join(svg_chunks(expr, per_path = 10)))
+    paths = root.findall(".//{http://www.w3.org/2000/svg}path")
+    commands = "".join(path.get("d") for path in paths).count("M")
+    assert commands == len(list(merge_collinear(iter(draw_tromp(expr)[1]))))
+    assert len(paths) == -(-commands // 10)
+    assert float(root.get("width")) >= draw_tromp(expr)[0].bottom_right()[0]
+
+def test_postscript():
+    document = "".join(postscript_chunks(s_com))
+    assert document.startswith("%!PS-Adobe-3.0 EPSF-3.0\n")
+    assert document.endswith("%%EOF\n")
+    assert document.count(" L\n") == len(list(merge_collinear(iter(draw_tromp(s_com)[1]))))
+
+def test_deep_diagram(tmp_path):
+    path = tmp_path / "deep.svg"
+    write_svg(nth_iter(3000), path)
+    assert ET.parse(path).getroot().tag.endswith("svg")
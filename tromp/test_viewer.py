@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import pytest
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+from main import *
+from combinators import s_com, y_com
+
+def test_frames_are_rendered_once():
+    pytest.importorskip("pygame")
+    frames = FrameCache((400, 300))
+    (surface, rect) = frames.get(s_com, (0, 0, 0))
+    assert frames.get(s_com, (0, 0, 0))[0] is surface
+    assert frames.get(s_com, (0, 128, 0))[0] is not surface
+
+def test_least_recently_used_frame_is_dropped():
+    pytest.importorskip("pygame")
+    frames = FrameCache((400, 300), capacity = 2)
+    first = frames.get(s_com, (0, 0, 0))
+    frames.get(y_com, (0, 0, 0))
+    frames.get(s_com, (0, 0, 0))
+    frames.get(s_com, (0, 128, 0))
+    assert frames.get(s_com, (0, 0, 0)) is first
+    assert (y_com, (0, 0, 0), View()) not in frames.frames
+
+def test_extent_covers_everything_drawn():
+    pytest.importorskip("pygame")
+    frames = FrameCache((400, 300))
+    (surface, rect) = frames.get(y_com, (0, 0, 0))
+    drawn = surface.copy()
+    drawn.set_colorkey((255, 255, 255))
+    assert rect.contains(drawn.get_bounding_rect())
+
+def test_zoomed_frames():
+    pytest.importorskip("pygame")
+    frames = FrameCache((400, 300))
+    (whole, _) = frames.get(y_com, (0, 0, 0))
+    (zoomed, rect) = frames.get(y_com, (0, 0, 0), View().zoomed(2))
+    assert zoomed is not whole
+    drawn = zoomed.copy()
+    drawn.set_colorkey((255, 255, 255))
+    assert rect.contains(drawn.get_bounding_rect())
+    assert rect.width > 1.5 * frames.get(y_com, (0, 0, 0))[1].width
+
+def test_core_imports_without_pygame():
+    # Batch jobs and worker processes only need the lambda calculus, not SDL
+    code = "import sys, core, main, combinators, bounded, parse, blc; assert 'pygame' not in sys.modules and 'numpy' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], cwd = os.path.dirname(os.path.abspath(__file__)), check = True)
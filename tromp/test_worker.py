@@ -0,0 +1,75 @@
+import threading
+import time
+import pytest
+from core import *
+from combinators import s_com, k_com, y_com, pred
+from bounded import Reduction, NORMAL_FORM, STEP_LIMIT
+from worker import ReductionWorker
+
+def drain(worker):
+    terms = []
+    while True:
+        term = worker.get(timeout = 5)
+        if term is None:
+            return terms
+        terms.append(term)
+
+def test_same_terms_as_reduction():
+    expr = appn(pred, nth_iter(4))
+    worker = ReductionWorker(Reduction(expr)).start()
+    assert drain(worker) == list(beta_reduce(expr))
+    assert worker.done and worker.result.reason == NORMAL_FORM
+    assert worker.poll() is None and worker.get() is None
+
+def test_prepare_runs_in_the_thread():
+    threads = set()
+    worker = ReductionWorker(Reduction(appn(s_com, k_com, k_com)), prepare = lambda term: threads.add(threading.current_thread()))
+    drain(worker.start())
+    assert threads == {worker._thread}
+
+def test_runs_only_a_few_steps_ahead():
+    seen = []
+    worker = ReductionWorker(Reduction(y_com, max_steps = 100), maxsize = 2, prepare = seen.append).start()
+    time.sleep(0.2)
+    # Two queued, and one more reduced and waiting for room
+    assert len(seen) <= 3
+    assert len(drain(worker)) == 101
+    assert worker.result.reason == STEP_LIMIT
+
+def test_poll_does_not_wait():
+    release = threading.Event()
+    worker = ReductionWorker(Reduction(appn(s_com, k_com, k_com)), prepare = lambda term: release.wait()).start()
+    start = time.monotonic()
+    assert worker.poll() is None
+    assert time.monotonic() - start < 0.1
+    release.set()
+    assert worker.get(timeout = 5) is not None
+
+def test_stop():
+    worker = ReductionWorker(Reduction(y_com), maxsize = 1).start()
+    assert worker.get(timeout = 5) is not None
+    worker.stop()
+    assert not worker._thread.is_alive()
+
+def test_errors_reach_the_reader():
+    def broken():
+        yield var("x")
+        raise ValueError("broken reduction")
+    worker = ReductionWorker(broken()).start()
+    assert worker.get(timeout = 5) is var("x")
+    with pytest.raises(ValueError, match = "broken reduction"):
+        worker.get(timeout = 5)
+    assert worker.done
+
+def test_threads_share_interned_nodes():
+    # Building the same terms from several threads at once still gives one node per term
+    results = []
+    def build():
+        results.append([nth_iter(n) for n in range(300)])
+    threads = [threading.Thread(target = build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for built in results[1:]:
+        assert all(a is b for (a, b) in zip(built, results[0]))
@@ -0,0 +1,114 @@
+"""
+Vector export of Tromp diagrams, for diagrams too big for a screen-sized raster.
+
+Segments are streamed from the layout straight into the output file, so memory use doesn't grow
+with the size of the diagram beyond the term itself. Segments along the same horizontal or vertical
+line that touch within a small window are merged on the way, which mostly joins each application's
+left wire with its output line and keeps files compact.
+
+  python vector.py "λf.(λx.f (x x)) λx.f (x x)" y.svg
+  python vector.py pred30.lam pred30.eps
+
+The term is written in the syntax parse.py reads, or is the term in a source file of that syntax.
+"""
+import sys
+from layout import MARGIN, DIAGRAM_GAP, LINE_THICKNESS, iter_segments, measure
+
+def merge_collinear(segments, window = 64):
+  """
+  Merge segments lying on the same horizontal or vertical line that overlap or touch.
+  Only the last `window` lines are kept open, so far apart segments on one line may stay separate.
+  """
+  # (vertical, fixed coordinate) -> [start, end] of the open segment on that line
+  pending = {}
+  for (x1, y1, x2, y2) in segments:
+    if x1 == x2:
+      key = (True, x1)
+      (lo, hi) = (y1, y2) if y1 <= y2 else (y2, y1)
+    elif y1 == y2:
+      key = (False, y1)
+      (lo, hi) = (x1, x2) if x1 <= x2 else (x2, x1)
+    else:
+      yield (x1, y1, x2, y2)
+      continue
+
+    span = pending.pop(key, None)
+    if span is not None:
+      if span[0] <= hi and lo <= span[1]:
+        (lo, hi) = (min(lo, span[0]), max(hi, span[1]))
+      else:
+        yield _segment(key, span)
+    elif len(pending) >= window:
+      # Dicts keep insertion order, so the first line is the one left untouched longest
+      oldest = next(iter(pending))
+      yield _segment(oldest, pending.pop(oldest))
+    pending[key] = (lo, hi)
+
+  for (key, span) in pending.items():
+    yield _segment(key, span)
+
+def _segment(key, span):
+  (vertical, at) = key
+  return (at, span[0], at, span[1]) if vertical else (span[0], at, span[1], at)
+
+def diagram_size(expr):
+  (x, y, width, height) = measure(expr)
+  # Lambda lines reach half a gap past the box on the right
+  return (x + width + DIAGRAM_GAP[0]/2 + 2 * MARGIN, y + height + 2 * MARGIN)
+
+def number(value):
+  return f"{value:g}"
+
+def svg_chunks(expr, color = "black", per_path = 500):
+  """The SVG document for the diagram of expr, piece by piece"""
+  (width, height) = diagram_size(expr)
+  yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+  yield (f'<svg xmlns="http://www.w3.org/2000/svg" width="{number(width)}" height="{number(height)}" '
+         f'viewBox="0 0 {number(width)} {number(height)}">\n')
+  yield f'<g fill="none" stroke="{color}" stroke-width="{LINE_THICKNESS}" stroke-linecap="square">\n'
+  commands = []
+  for (x1, y1, x2, y2) in merge_collinear(iter_segments(expr)):
+    # Horizontal and vertical lines only need one coordinate after the move
+    end = f"H{number(x2)}" if y1 == y2 else f"V{number(y2)}" if x1 == x2 else f"L{number(x2)} {number(y2)}"
+    commands.append(f"M{number(x1)} {number(y1)}{end}")
+    if len(commands) == per_path:
+      yield f'<path d="{"".join(commands)}"/>\n'
+      commands = []
+  if commands:
+    yield f'<path d="{"".join(commands)}"/>\n'
+  yield "</g>\n</svg>\n"
+
+def postscript_chunks(expr):
+  """An encapsulated PostScript document for the diagram of expr, piece by piece"""
+  (width, height) = diagram_size(expr)
+  yield "%!PS-Adobe-3.0 EPSF-3.0\n"
+  yield f"%%BoundingBox: 0 0 {int(width + 1)} {int(height + 1)}\n"
+  yield "%%EndComments\n"
+  # Flip the y axis so the layout's coordinates can be used as they are
+  yield f"0 {number(height)} translate 1 -1 scale\n"
+  yield f"{LINE_THICKNESS} setlinewidth 2 setlinecap\n"
+  yield "/L { moveto lineto stroke } bind def\n"
+  for (x1, y1, x2, y2) in merge_collinear(iter_segments(expr)):
+    yield f"{number(x2)} {number(y2)} {number(x1)} {number(y1)} L\n"
+  yield "showpage\n%%EOF\n"
+
+def write_svg(expr, path):
+  with open(path, "w") as out:
+    out.writelines(svg_chunks(expr))
+
+def write_postscript(expr, path):
+  with open(path, "w") as out:
+    out.writelines(postscript_chunks(expr))
+
+if __name__ == "__main__":
+  from parse import parse_argument, ParseError
+  if len(sys.argv) != 3:
+    print("usage: python vector.py TERM|FILE OUT.svg|OUT.eps", file = sys.stderr)
+    sys.exit(1)
+  (source, path) = sys.argv[1:]
+  try:
+    expr = parse_argument(source)
+  except ParseError as error:
+    print(error, file = sys.stderr)
+    sys.exit(1)
+  (write_postscript if path.endswith((".ps", ".eps")) else write_svg)(expr, path)
@@ -0,0 +1,94 @@
+"""
+Reduction in a background thread.
+
+A step can take far longer than a frame once terms get big, and the viewer can't handle events
+while it waits for one. `ReductionWorker` runs the reduction in a daemon thread instead, optionally
+preparing each term for drawing there as well, and hands the terms over through a bounded queue.
+The thread runs at most `maxsize` steps ahead of whoever is reading, and the reader only ever
+takes what is already waiting.
+
+Terms can be built from both threads at once, since interning in terms.py hands every thread the
+same node for the same term.
+"""
+import queue
+import threading
+
+# Queued after the last term, or with the exception that stopped the reduction
+_DONE = "done"
+_FAILED = "failed"
+
+class ReductionWorker:
+  """
+  The terms of a Reduction (or any iterable of terms), produced in a thread. prepare, if given,
+  is called on each term in the thread before it is queued, to get layout out of the way.
+  Once `done` is true, the reduction's `result` says why it stopped.
+  """
+  def __init__(self, reduction, maxsize = 4, prepare = None):
+    self.reduction = reduction
+    self.prepare = prepare
+    self.queue = queue.Queue(maxsize)
+    self.done = False
+    self._stop = threading.Event()
+    self._thread = threading.Thread(target = self._run, name = "reduction", daemon = True)
+
+  def start(self):
+    self._thread.start()
+    return self
+
+  def _put(self, item):
+    # Wait for room, but give up as soon as the worker is stopped
+    while not self._stop.is_set():
+      try:
+        self.queue.put(item, timeout = 0.05)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  def _run(self):
+    try:
+      for term in self.reduction:
+        if self.prepare is not None:
+          self.prepare(term)
+        if not self._put((None, term)):
+          return
+      self._put((_DONE, None))
+    except Exception as error:
+      self._put((_FAILED, error))
+
+  def _take(self, item):
+    (status, value) = item
+    if status is None:
+      return value
+    self.done = True
+    if status == _FAILED:
+      raise value
+    return None
+
+  def poll(self):
+    """The next term if one is ready, otherwise None straight away. None from then on once done."""
+    if self.done:
+      return None
+    try:
+      return self._take(self.queue.get_nowait())
+    except queue.Empty:
+      return None
+
+  def get(self, timeout = None):
+    """The next term, waiting up to timeout seconds for it (None waits for as long as it takes)"""
+    if self.done:
+      return None
+    try:
+      return self._take(self.queue.get(timeout = timeout))
+    except queue.Empty:
+      return None
+
+  @property
+  def result(self):
+    return getattr(self.reduction, "result", None)
+
+  def stop(self, wait = True):
+    """Stop reducing, by default waiting for the thread to finish the step it is on"""
+    self._stop.set()
+    if wait and self._thread.ident is not None:
+      self._thread.join()